@@ -0,0 +1,192 @@
+# backend/analytics.py
+"""Long-range patterns in a child's logs, computed with NumPy.
+
+One query loads a child's logs as two integer columns: the timestamp in
+epoch seconds and the category code. Everything after that is array
+arithmetic over those columns:
+
+- gaps between consecutive logs of each category (eg time between feeds)
+- daily counts per category and their rolling mean
+- days whose count is far from the trailing baseline (eg a behaviour spike)
+- weekly mean time of day of sleep logs and how fast it drifts
+
+Timestamps are UTC, like everywhere else in the app.
+"""
+import itertools
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, case, cast, func, select
+
+from backend.models import db, LogEntry
+
+CATEGORIES = ("Diet", "Sleep", "Behaviour", "Medical", "Other")
+OTHER = CATEGORIES.index("Other")
+SLEEP = CATEGORIES.index("Sleep")
+
+DAY = 24 * 60 * 60
+DEFAULT_DAYS = 365
+MAX_DAYS = 730
+ROLLING_DAYS = 7
+BASELINE_DAYS = 28
+ANOMALY_Z = 3.0
+
+
+def load_log_columns(household_id, child_id, start, end):
+    """(times, codes) of the child's logs in [start, end), oldest first.
+
+    times are int64 epoch seconds and codes index into CATEGORIES. SQLite
+    does the conversion, so no datetime or string objects are built per row.
+    """
+    stmt = (
+        select(
+            cast(func.strftime("%s", LogEntry.timestamp), Integer),
+            case(
+                {name: code for code, name in enumerate(CATEGORIES)},
+                value=LogEntry.category,
+                else_=OTHER,
+            ),
+        )
+        .where(
+            LogEntry.household_id == household_id,
+            LogEntry.child_id == child_id,
+            LogEntry.timestamp >= start,
+            LogEntry.timestamp < end,
+        )
+        .order_by(LogEntry.timestamp.asc())
+    )
+    rows = db.session.execute(stmt).all()
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows))
+    columns = flat.reshape(-1, 2)
+    return columns[:, 0], columns[:, 1].astype(np.int8)
+
+
+def daily_counts(day_index, codes, days):
+    """days x categories matrix of log counts."""
+    flat = np.bincount(day_index * len(CATEGORIES) + codes, minlength=days * len(CATEGORIES))
+    return flat.reshape(days, len(CATEGORIES))
+
+
+def rolling_mean(counts, window=ROLLING_DAYS):
+    """Mean daily count over the `window` days ending on each day (fewer at the start)."""
+    totals = np.vstack([np.zeros((1, counts.shape[1]), dtype=np.int64), np.cumsum(counts, axis=0)])
+    ends = np.arange(1, counts.shape[0] + 1)
+    starts = np.maximum(ends - window, 0)
+    return (totals[ends] - totals[starts]) / (ends - starts)[:, None]
+
+
+def anomalies(counts, baseline=BASELINE_DAYS, z=ANOMALY_Z):
+    """Boolean mask, mean and std of days far from the `baseline` days before them.
+
+    The std is floored at one log so a quiet baseline does not flag every
+    single entry. Days without a full baseline are never flagged.
+    """
+    days = counts.shape[0]
+    zeros = np.zeros((1, counts.shape[1]), dtype=np.int64)
+    totals = np.vstack([zeros, np.cumsum(counts, axis=0)])
+    squares = np.vstack([zeros, np.cumsum(counts.astype(np.int64) ** 2, axis=0)])
+
+    ends = np.arange(days)
+    starts = np.maximum(ends - baseline, 0)
+    n = np.maximum(ends - starts, 1)[:, None]
+    mean = (totals[ends] - totals[starts]) / n
+    variance = (squares[ends] - squares[starts]) / n - mean ** 2
+    std = np.sqrt(np.maximum(variance, 0.0))
+
+    flagged = np.abs(counts - mean) > z * np.maximum(std, 1.0)
+    flagged[:baseline] = False
+    return flagged, mean, std
+
+
+def gap_stats(times, codes):
+    """{category: {count, mean/median/p90 hours between consecutive logs}}."""
+    stats = {}
+    for code, name in enumerate(CATEGORIES):
+        category_times = times[codes == code]
+        entry = {"count": int(category_times.size), "gap_hours": None}
+        if category_times.size > 1:
+            gaps = np.diff(category_times) / 3600.0
+            mean, median, p90 = gaps.mean(), *np.percentile(gaps, [50, 90])
+            entry["gap_hours"] = {
+                "mean": round(float(mean), 2),
+                "median": round(float(median), 2),
+                "p90": round(float(p90), 2),
+            }
+        stats[name] = entry
+    return stats
+
+
+def timing_drift(times, day_index, mask, origin):
+    """Weekly mean time of day of the masked logs and its slope in minutes per week.
+
+    Times of day are averaged on a circle so 23:30 and 00:30 average to
+    midnight rather than noon.
+    """
+    if not mask.any():
+        return [], None
+    angle = (times[mask] % DAY) * (2 * np.pi / DAY)
+    week = day_index[mask] // 7
+    weeks = int(week.max()) + 1
+    logs = np.bincount(week, minlength=weeks)
+    sin = np.bincount(week, weights=np.sin(angle), minlength=weeks)
+    cos = np.bincount(week, weights=np.cos(angle), minlength=weeks)
+
+    present = np.flatnonzero(logs)
+    mean_angle = np.unwrap(np.arctan2(sin[present], cos[present]))
+    minutes = mean_angle * (24 * 60 / (2 * np.pi))
+    slope = float(np.polyfit(present, minutes, 1)[0]) if present.size > 1 else None
+
+    week_starts = (origin + 7 * present).astype(str)
+    weekly = [
+        {
+            "week_start": str(start),
+            "logs": int(logs[w]),
+            "mean_time": "%02d:%02d" % divmod(int(m) % (24 * 60), 60),
+        }
+        for start, w, m in zip(week_starts, present, minutes)
+    ]
+    return weekly, None if slope is None else round(slope, 2)
+
+
+def analyze_child(household_id, child_id, days=DEFAULT_DAYS, now=None):
+    """JSON-ready report over the `days` days up to and including today."""
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days - 1)
+    end = today + timedelta(days=1)
+
+    times, codes = load_log_columns(household_id, child_id, start, end)
+    start_epoch = int((start - datetime(1970, 1, 1)).total_seconds())
+    day_index = (times - start_epoch) // DAY
+
+    counts = daily_counts(day_index, codes, days)
+    rates = rolling_mean(counts)
+    flagged, baseline_mean, _ = anomalies(counts)
+    origin = np.datetime64(start.date())
+    weekly_sleep, sleep_drift = timing_drift(times, day_index, codes == SLEEP, origin)
+
+    dates = (origin + np.arange(days)).astype(str)
+    flagged_days, flagged_codes = np.nonzero(flagged)
+
+    return {
+        "start": start.date().isoformat(),
+        "end": today.date().isoformat(),
+        "days": days,
+        "total_logs": int(times.size),
+        "categories": gap_stats(times, codes),
+        "sleep_timing": {"weekly": weekly_sleep, "drift_minutes_per_week": sleep_drift},
+        "rolling_rates": {
+            "window_days": ROLLING_DAYS,
+            "dates": dates.tolist(),
+            **{name: np.round(rates[:, code], 2).tolist() for code, name in enumerate(CATEGORIES)},
+        },
+        "anomalies": [
+            {
+                "date": str(dates[d]),
+                "category": CATEGORIES[c],
+                "count": int(counts[d, c]),
+                "baseline": round(float(baseline_mean[d, c]), 2),
+                "direction": "spike" if counts[d, c] > baseline_mean[d, c] else "drop",
+            }
+            for d, c in zip(flagged_days, flagged_codes)
+        ],
+    }
@@ -1,23 +1,116 @@
 # backend/app.py
 
 import os
+import time
 from functools import wraps
 from datetime import datetime, timedelta, timezone
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import (
+    Flask, Response, render_template, stream_template, request, redirect, url_for, flash,
+    get_flashed_messages, jsonify,
+)
+from jinja2 import FileSystemBytecodeCache
+import click
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from backend.models import db, User, Household, Child, LogEntry, InviteCode, ScheduleItem, ScheduleException, AISummary 
+from backend.models import add_missing_columns, db, User, Household, Child, LogEntry, InviteCode, ScheduleItem, ScheduleException, AISummary 
+from backend.analytics import DEFAULT_DAYS, MAX_DAYS, analyze_child
+from backend.backup import BackupError, backup_set, rotate
+from backend.changes import backfill_change_log, changes_since, init_change_log
+from backend.compression import init_compression
+from backend.household_cache import (
+    active_invite_count,
+    household_child,
+    household_children,
+    household_name,
+    init_household_cache,
+    invalidate_household,
+    latest_invites,
+)
+from backend.household_timetable import (
+    HOURS,
+    RANGES,
+    build_household_timetable,
+    calendar_weeks,
+    resolve_range,
+)
+from backend.read_models import (
+    TimetableEntry,
+    child_events,
+    child_logs_between,
+    household_logs,
+    household_summaries,
+    skipped_dates_between,
+)
+from backend.sharding import (
+    ShardRouter,
+    ShardingError,
+    add_invite_route,
+    create_directory_tables,
+    household_for_invite,
+    init_sharding,
+    shard_exists,
+    sharding_enabled,
+    split_into_shards,
+    use_household,
+)
+from backend.scheduling import (
+    DEFAULT_DURATION_MINUTES,
+    MAX_DURATION_MINUTES,
+    find_schedule_conflict,
+    occurrences_between,
+)
 app = Flask(__name__, instance_relative_config=True)
 os.makedirs(app.instance_path, exist_ok=True)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(app.instance_path, "nannyloop.db")
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", "sqlite:///" + os.path.join(app.instance_path, "nannyloop.db")
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# large pages (dashboard, timetable) are streamed to the client as they render
+app.config["STREAM_TEMPLATES"] = os.environ.get("STREAM_TEMPLATES", "1") != "0"
+app.config["STREAM_CHUNK_SIZE"] = 8192
+# compiled templates are kept on disk so new workers skip the Jinja compile step
+app.config["TEMPLATE_CACHE_DIR"] = os.environ.get(
+    "TEMPLATE_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache")
+)
+os.makedirs(app.config["TEMPLATE_CACHE_DIR"], exist_ok=True)
+app.jinja_options = {
+    **app.jinja_options,
+    "bytecode_cache": FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_DIR"]),
+}
+# gzip text responses; lower levels trade bytes on the wire for CPU
+app.config["COMPRESS_LEVEL"] = int(os.environ.get("COMPRESS_LEVEL", 6))
+# seconds between "gzip level ..." log lines with bytes saved and CPU spent; 0 = off
+app.config["COMPRESS_STATS_INTERVAL"] = int(os.environ.get("COMPRESS_STATS_INTERVAL", 0))
+# one SQLite file per household for Child/LogEntry/ScheduleItem/...; see backend/sharding.py
+app.config["SHARDING_ENABLED"] = os.environ.get("SHARDING_ENABLED", "0") == "1"
+if os.environ.get("SHARD_DIR"):
+    app.config["SHARD_DIR"] = os.environ["SHARD_DIR"]
+# WAL lets writers commit while a streamed page still holds a read cursor
+app.config["SQLITE_WAL"] = os.environ.get("SQLITE_WAL", "1") != "0"
+# "sqlite" shares cache invalidations between worker processes; "local" is per process
+app.config["HOUSEHOLD_CACHE_BACKEND"] = os.environ.get("HOUSEHOLD_CACHE_BACKEND", "local")
 db.init_app(app)
+init_sharding(app, db)
+init_compression(app)
+init_household_cache(app)
+init_change_log(db.session.session_factory.class_)
 login_manager = LoginManager()
 login_manager.login_view = "login"
 login_manager.init_app(app)
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))  
+@app.before_request
+def select_household_shard():
+    if current_user.is_authenticated:
+        use_household(current_user.household_id)
+def find_invite(code):
+    if sharding_enabled():
+        household_id = household_for_invite(db.session, code)
+        if household_id is None:
+            return None
+        use_household(household_id)
+    return InviteCode.query.filter_by(code=code).first()
 def role_required(role_name: str):
     def decorator(fn):
         @wraps(fn)
@@ -30,6 +123,26 @@ def role_required(role_name: str):
             return fn(*args, **kwargs)
         return wrapper
     return decorator
+def _coalesce(chunks, size):
+    # Jinja yields one small string per template statement; batch them up
+    buf = []
+    buffered = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield "".join(buf)
+def render_page(template_name, **context):
+    if not app.config["STREAM_TEMPLATES"]:
+        return render_template(template_name, **context)
+    # the session cookie is written before the body streams, so pop flashes now
+    get_flashed_messages(with_categories=True)
+    chunks = stream_template(template_name, **context)
+    return Response(_coalesce(chunks, app.config["STREAM_CHUNK_SIZE"]), mimetype="text/html")
 @app.route("/")
 def home():
     if current_user.is_authenticated:
@@ -38,33 +151,23 @@ def home():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    children = Child.query.filter_by(household_id=current_user.household_id).all()
-    logs = (
-        LogEntry.query
-        .filter_by(household_id=current_user.household_id)
-        .order_by(LogEntry.timestamp.desc())
-        .all()
-    )
+    children = household_children(current_user.household_id)
+    # iterated lazily by the template so streamed pages start before every row is loaded
+    logs = household_logs(current_user.household_id)
     active_invites = []
+    invite_count = 0
     if current_user.role == "parent":
-        active_invites = (
-            InviteCode.query
-            .filter_by(household_id=current_user.household_id)
-            .order_by(InviteCode.created_at.desc())
-            .limit(5)
-            .all()
-        )
-    summaries = (
-        AISummary.query
-        .filter_by(household_id=current_user.household_id)
-        .order_by(AISummary.created_at.desc())
-        .all()
-    )
-    return render_template(
+        invite_count = active_invite_count(current_user.household_id)
+        active_invites = latest_invites(current_user.household_id)
+    # plain rows: a streamed page renders after the request's session is closed
+    summaries = household_summaries(current_user.household_id)
+    return render_page(
         "index.html",
+        household_name=household_name(current_user.household_id),
         children=children,
         logs=logs,
         active_invites=active_invites,
+        invite_count=invite_count,
         summaries=summaries
     )
 @app.route("/register-parent", methods=["GET", "POST"])
@@ -92,7 +195,7 @@ def register_carer():
         invite_code = request.form["invite_code"].strip()
         email = request.form["email"].strip().lower()
         password = request.form["password"]
-        invite = InviteCode.query.filter_by(code=invite_code).first()
+        invite = find_invite(invite_code)
         if not invite or not invite.is_valid():
             flash("Invite code is invalid or expired.", "error")
             return redirect(url_for("register_carer"))
@@ -106,6 +209,7 @@ def register_carer():
         invite.used_by_user_id = user.id
         invite.used_at = db.func.now()
         db.session.commit()
+        invalidate_household(invite.household_id)
         login_user(user)
         return redirect(url_for("dashboard"))
     return render_template("register_carer.html")
@@ -138,7 +242,10 @@ def create_invite():
         hours=hours
     )
     db.session.add(invite)
+    if sharding_enabled():
+        add_invite_route(db.session, invite.code, invite.household_id)
     db.session.commit()
+    invalidate_household(current_user.household_id)
     flash("Invite created.", "success")
     return redirect(url_for("dashboard"))
 
@@ -285,6 +392,7 @@ def add_child():
     )
     db.session.add(child)
     db.session.commit()
+    invalidate_household(current_user.household_id)
     return redirect(url_for("dashboard"))
 @app.route("/add_log", methods=["POST"])
 @login_required
@@ -293,7 +401,7 @@ def add_log():
     carer_name = request.form["carer"].strip()
     category = request.form["category"].strip()
     notes = request.form["notes"].strip()
-    child = Child.query.filter_by(id=child_id, household_id=current_user.household_id).first()
+    child = household_child(current_user.household_id, child_id)
     if not child:
         flash("Invalid child selected.", "error")
         return redirect(url_for("dashboard"))
@@ -320,10 +428,7 @@ def add_log():
 def generate_summary():
     child_id = request.form.get("child_id", type=int)
 
-    child = Child.query.filter_by(
-        id=child_id,
-        household_id=current_user.household_id
-    ).first()
+    child = household_child(current_user.household_id, child_id)
 
     if not child:
         flash("Invalid child selected.", "error")
@@ -369,6 +474,22 @@ def generate_summary():
 
     flash("Weekly summary generated.", "success")
     return redirect(url_for("dashboard"))
+def parse_duration(raw):
+    if not raw:
+        return DEFAULT_DURATION_MINUTES
+    if not raw.isdigit():
+        return None
+    minutes = int(raw)
+    if minutes < 1 or minutes > MAX_DURATION_MINUTES:
+        return None
+    return minutes
+
+
+def conflict_message(conflict):
+    title, when = conflict
+    return f"This clashes with \"{title}\" on {when.strftime('%d %b %Y at %H:%M')}."
+
+
 @app.route("/add_event", methods=["POST"])
 @login_required
 def add_event():
@@ -378,6 +499,7 @@ def add_event():
     category = request.form.get("category", "Other").strip()
     notes = request.form.get("notes", "").strip()
     when_raw = request.form.get("start_time", "").strip()
+    duration_raw = request.form.get("duration", "").strip()
     repeat_type = request.form.get("repeat_type", "").strip()
     repeat_until_raw = request.form.get("repeat_until", "").strip()
 
@@ -385,7 +507,7 @@ def add_event():
         flash("Please fill in title and time.", "error")
         return redirect(url_for("timetable", child_id=child_id, week=week) if child_id else url_for("timetable"))
 
-    child = Child.query.filter_by(id=child_id, household_id=current_user.household_id).first()
+    child = household_child(current_user.household_id, child_id)
     if not child:
         flash("Invalid child selected.", "error")
         return redirect(url_for("timetable"))
@@ -396,6 +518,11 @@ def add_event():
         flash("Invalid date/time format.", "error")
         return redirect(url_for("timetable", child_id=child_id, week=week))
 
+    duration_minutes = parse_duration(duration_raw)
+    if duration_minutes is None:
+        flash(f"Duration must be between 1 and {MAX_DURATION_MINUTES} minutes.", "error")
+        return redirect(url_for("timetable", child_id=child_id, week=week))
+
     repeat_until = None
     rrule = None
 
@@ -420,6 +547,14 @@ def add_event():
                 flash("Repeat until date must be after the start time.", "error")
                 return redirect(url_for("timetable", child_id=child_id, week=week))
 
+    conflict = find_schedule_conflict(
+        current_user.household_id, child_id, start_time, duration_minutes,
+        rrule=rrule, repeat_until=repeat_until,
+    )
+    if conflict:
+        flash(conflict_message(conflict), "error")
+        return redirect(url_for("timetable", child_id=child_id, week=week))
+
     item = ScheduleItem(
         household_id=current_user.household_id,
         child_id=child_id,
@@ -427,6 +562,7 @@ def add_event():
         category=category,
         notes=notes if notes else None,
         start_time=start_time,
+        duration_minutes=duration_minutes,
         rrule=rrule,
         repeat_until=repeat_until,
         created_by_user_id=current_user.id,
@@ -518,6 +654,9 @@ def delete_event_permanently(event_id):
 
     child_id = event.child_id
 
+    # through the session so the change log records a tombstone for each skipped date
+    for ex in ScheduleException.query.filter_by(schedule_item_id=event.id).all():
+        db.session.delete(ex)
     db.session.delete(event)
     db.session.commit()
 
@@ -540,6 +679,14 @@ def undo_delete_event(event_id):
         return redirect(url_for("timetable"))
 
     child_id = event.child_id
+    conflict = find_schedule_conflict(
+        current_user.household_id, child_id, event.start_time, event.duration_minutes,
+        rrule=event.rrule, repeat_until=event.repeat_until, item_id=event.id,
+    )
+    if conflict:
+        flash(conflict_message(conflict), "error")
+        return redirect(url_for("timetable", child_id=child_id, week=week))
+
     event.is_deleted = False
     db.session.commit()
 
@@ -583,6 +730,7 @@ def update_event(event_id):
     category = request.form.get("category", "Other").strip()
     notes = request.form.get("notes", "").strip()
     when_raw = request.form.get("start_time", "").strip()
+    duration_raw = request.form.get("duration", "").strip()
 
     if not title or not when_raw:
         flash("Title and time are required.", "error")
@@ -594,10 +742,24 @@ def update_event(event_id):
         flash("Invalid date/time format.", "error")
         return redirect(url_for("edit_event", event_id=event.id, week=week))
 
+    duration_minutes = parse_duration(duration_raw)
+    if duration_minutes is None:
+        flash(f"Duration must be between 1 and {MAX_DURATION_MINUTES} minutes.", "error")
+        return redirect(url_for("edit_event", event_id=event.id, week=week))
+
+    conflict = find_schedule_conflict(
+        current_user.household_id, event.child_id, start_time, duration_minutes,
+        rrule=event.rrule, repeat_until=event.repeat_until, item_id=event.id,
+    )
+    if conflict:
+        flash(conflict_message(conflict), "error")
+        return redirect(url_for("edit_event", event_id=event.id, week=week))
+
     event.title = title
     event.category = category
     event.notes = notes if notes else None
     event.start_time = start_time
+    event.duration_minutes = duration_minutes
 
     db.session.commit()
 
@@ -606,20 +768,42 @@ def update_event(event_id):
 
 
 
+@app.route("/changes")
+@login_required
+def changes():
+    since = request.args.get("since", 0, type=int)
+    limit = min(request.args.get("limit", 500, type=int), 1000)
+    if since < 0 or limit < 1:
+        return jsonify(error="since must be >= 0 and limit >= 1"), 400
+    entries, next_since, more = changes_since(current_user.household_id, since, limit)
+    return jsonify(changes=entries, since=next_since, more=more)
+
+
+
+@app.route("/analytics/<int:child_id>")
+@login_required
+def child_analytics(child_id):
+    child = household_child(current_user.household_id, child_id)
+    if not child:
+        return jsonify(error="Child not found"), 404
+    days = request.args.get("days", DEFAULT_DAYS, type=int)
+    if not 1 <= days <= MAX_DAYS:
+        return jsonify(error=f"days must be between 1 and {MAX_DAYS}"), 400
+    report = analyze_child(current_user.household_id, child.id, days)
+    return jsonify(child={"id": child.id, "name": child.name}, **report)
+
+
 @app.route("/timetable")
 @login_required
 def timetable():
-    children = Child.query.filter_by(household_id=current_user.household_id).all()
+    children = household_children(current_user.household_id)
     if not children:
         flash("Add a child first, then you can view the timetable.", "error")
         return redirect(url_for("dashboard"))
     selected_child_id = request.args.get("child_id", type=int)
     if selected_child_id is None:
         selected_child_id = children[0].id
-    selected_child = Child.query.filter_by(
-        id=selected_child_id,
-        household_id=current_user.household_id
-    ).first()
+    selected_child = household_child(current_user.household_id, selected_child_id)
     if not selected_child:
         flash("Invalid child selected.", "error")
         return redirect(url_for("dashboard"))
@@ -635,24 +819,9 @@ def timetable():
     next_week = start_of_week + timedelta(days=7)
     hours = list(range(6, 22, 2))  # 06:00 to 20:00 in 2 hour slots
     # logs
-    logs = (
-        LogEntry.query
-        .filter_by(household_id=current_user.household_id, child_id=selected_child.id)
-        .filter(LogEntry.timestamp >= start_of_week, LogEntry.timestamp < end_of_week)
-        .order_by(LogEntry.timestamp.asc())
-        .all()
-    )
+    logs = child_logs_between(current_user.household_id, selected_child.id, start_of_week, end_of_week)
     # timetable events
-    events = (
-        ScheduleItem.query
-        .filter_by(
-            household_id=current_user.household_id,
-            child_id=selected_child.id,
-            is_deleted=False
-        )
-        .order_by(ScheduleItem.start_time.asc())
-        .all()
-    )
+    events = child_events(current_user.household_id, selected_child.id)
 
     deleted_events = (
         ScheduleItem.query
@@ -666,9 +835,9 @@ def timetable():
         .all()
     )
 
-    exceptions = ScheduleException.query.all()
-    skipped_lookup = {(ex.schedule_item_id, ex.skipped_date) for ex in exceptions}
-
+    skipped_lookup = skipped_dates_between(
+        current_user.household_id, start_of_week, end_of_week, selected_child.id
+    )
 
     # grid: (day_index, hour_slot) -> list of entries
     grid = {}
@@ -680,67 +849,38 @@ def timetable():
             hour_slot = 20
         return hour_slot
     for ev in events:
-        event_times = []
-
-        if not ev.rrule:
-            if start_of_week <= ev.start_time < end_of_week:
-                event_times.append(ev.start_time)
-
-        
-
-        elif ev.rrule == "FREQ=DAILY":
-            current_dt = ev.start_time
-
-            while current_dt < start_of_week:
-                current_dt += timedelta(days=1)
-
-            while current_dt < end_of_week:
-                if ev.repeat_until is None or current_dt <= ev.repeat_until:
-                    if (ev.id, current_dt.date()) not in skipped_lookup:
-                        event_times.append(current_dt)
-                current_dt += timedelta(days=1)
-
-        elif ev.rrule == "FREQ=WEEKLY":
-            current_dt = ev.start_time
-
-            while current_dt < start_of_week:
-                current_dt += timedelta(days=7)
-
-            while current_dt < end_of_week:
-                if ev.repeat_until is None or current_dt <= ev.repeat_until:
-                    if (ev.id, current_dt.date()) not in skipped_lookup:
-                        event_times.append(current_dt)
-                current_dt += timedelta(days=7)
+        event_times = occurrences_between(ev, start_of_week, end_of_week, skipped_lookup)
 
         for dt in event_times:
             day_index = (dt.date() - start_of_week.date()).days
             if 0 <= day_index <= 6:
-                grid.setdefault((day_index, slot_for(dt)), []).append({
-                    "id": ev.id,
-                    "kind": "event",
-                    "category": ev.category,
-                    "time": dt,
-                    "title": ev.title,
-                    "notes": ev.notes or "",
-                    "rrule": ev.rrule,
-                    "occurrence_date": dt.strftime("%Y-%m-%d"),
-                })
+                grid.setdefault((day_index, slot_for(dt)), []).append(TimetableEntry(
+                    kind="event",
+                    category=ev.category,
+                    time=dt,
+                    title=ev.title,
+                    notes=ev.notes or "",
+                    id=ev.id,
+                    end_time=dt + timedelta(minutes=ev.duration_minutes or 0),
+                    rrule=ev.rrule,
+                    occurrence_date=dt.strftime("%Y-%m-%d"),
+                ))
     for lg in logs:
         dt = lg.timestamp
         day_index = (dt.date() - start_of_week.date()).days
         if 0 <= day_index <= 6:
-            grid.setdefault((day_index, slot_for(dt)), []).append({
-                "kind": "log",
-                "category": lg.category,
-                "time": dt,
-                "title": lg.category,
-                "notes": lg.notes,
-                "carer": lg.carer_name,
-            })
+            grid.setdefault((day_index, slot_for(dt)), []).append(TimetableEntry(
+                kind="log",
+                category=lg.category,
+                time=dt,
+                title=lg.category,
+                notes=lg.notes,
+                carer=lg.carer_name,
+            ))
     # sort each cell by time
     for key in grid:
-        grid[key].sort(key=lambda x: x["time"])
-    return render_template(
+        grid[key].sort(key=lambda x: x.time)
+    return render_page(
         "timetable.html",
         children=children,
         selected_child_id=selected_child.id,
@@ -754,14 +894,118 @@ def timetable():
         deleted_events=deleted_events,
 
     )
+
+
+@app.route("/household_timetable")
+@login_required
+def household_timetable():
+    children = household_children(current_user.household_id)
+    if not children:
+        flash("Add a child first, then you can view the timetable.", "error")
+        return redirect(url_for("dashboard"))
+    range_name = request.args.get("range", "week")
+    try:
+        start, end, prev_start, next_start = resolve_range(
+            range_name, request.args.get("start"), datetime.utcnow()
+        )
+    except ValueError:
+        flash("Invalid timetable range.", "error")
+        return redirect(url_for("household_timetable"))
+    timetable = build_household_timetable(current_user.household_id, children, start, end)
+    return render_page(
+        "household_timetable.html",
+        children=children,
+        range_name=range_name,
+        ranges=list(RANGES),
+        start=start,
+        end=end,
+        prev_start=prev_start,
+        next_start=next_start,
+        weeks=calendar_weeks(start, end),
+        hours=HOURS,
+        lanes=timetable.lanes,
+        overflow=timetable.overflow,
+        timedelta=timedelta,
+    )
+def create_tables():
+    """Create missing tables, add columns older databases lack and backfill the change log.
+
+    Returns (columns added, change log rows backfilled).
+    """
+    db.create_all()
+    added = add_missing_columns(db.engine)
+    if sharding_enabled():
+        # the change log lives in each household's shard
+        create_directory_tables(db.engine)
+        backfilled = 0
+        for household_id in db.session.scalars(db.select(Household.id)).all():
+            if shard_exists(household_id):
+                use_household(household_id)
+                backfilled += backfill_change_log(db.session)
+    else:
+        backfilled = backfill_change_log(db.session)
+    db.session.commit()
+    return added, backfilled
 @app.cli.command("init-db")
 def init_db():
     """Create all database tables."""
     with app.app_context():
-        db.create_all()
+        added, backfilled = create_tables()
+    for column in added:
+        print(f"Added column {column}.")
+    if backfilled:
+        print(f"Logged {backfilled} existing records in the change log.")
     print("Database tables created.")
+@app.cli.command("split-shards")
+@click.option("--force", is_flag=True, help="Overwrite shards that already hold data.")
+def split_shards(force):
+    """Copy each household's data from the main database into its shard file."""
+    if app.config["SHARDING_ENABLED"] and not force:
+        raise click.ClickException(
+            "SHARDING_ENABLED is on, so the shards hold the live data and the main "
+            "database's household tables are stale. Pass --force to overwrite the shards anyway."
+        )
+    with app.app_context():
+        router = ShardRouter(app.config["SHARD_DIR"], db.metadata, wal=app.config["SQLITE_WAL"])
+        try:
+            copied = split_into_shards(db.engine, router, force=force)
+        except ShardingError as exc:
+            raise click.ClickException(f"{exc}. Pass --force to overwrite them.")
+        finally:
+            router.dispose()
+    for household_id, rows in copied.items():
+        print(f"Household {household_id}: {rows} rows -> {router.path_for(household_id)}")
+    print(f"Split {len(copied)} households. Set SHARDING_ENABLED=1 to serve from the shards.")
+@app.cli.command("backup-db")
+@click.option("--dest", default=None, help="Directory for backup sets (default: instance/backups).")
+@click.option("--keep", default=7, show_default=True, help="Number of backup sets to keep.")
+@click.option("--compress/--no-compress", default=True, show_default=True)
+@click.option("--pages", default=1024, show_default=True, help="Pages copied per backup step.")
+@click.option("--pause", default=0.005, show_default=True, help="Seconds to yield to writers between steps.")
+@click.option("--every", default=0, help="Keep running and back up every N minutes.")
+@click.option("--blocking-fallback", is_flag=True,
+              help="Without WAL, copy a constantly changing file in one step even though that blocks writers.")
+def backup_db(dest, keep, compress, pages, pause, every, blocking_fallback):
+    """Back up the live database without stopping the app (writers keep going in WAL mode)."""
+    dest = dest or os.path.join(app.instance_path, "backups")
+    os.makedirs(dest, exist_ok=True)
+    with app.app_context():
+        main_db = db.engine.url.database
+    shard_dir = app.config["SHARD_DIR"] if app.config["SHARDING_ENABLED"] else None
+    while True:
+        try:
+            report = backup_set(main_db, dest, shard_dir=shard_dir, compress=compress, pages=pages,
+                                pause=pause, blocking_fallback=blocking_fallback)
+        except BackupError as exc:
+            raise click.ClickException(str(exc))
+        print(f"Backup verified: {report}")
+        for path in rotate(dest, keep):
+            print(f"Removed old backup {path}")
+        if not every:
+            break
+        time.sleep(every * 60)
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        create_tables()
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port, debug=False)
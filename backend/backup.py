@@ -0,0 +1,205 @@
+# backend/backup.py
+"""Online SQLite backups that do not stop the app.
+
+Uses the SQLite backup API a few pages at a time and sleeps between steps.
+The app runs SQLite in WAL mode, where the backup's reads never block
+writers. On a rollback-journal database each step read-locks the source
+briefly and writers wait for it. Each run writes a backup set directory
+holding the main database and, in sharded mode, every household shard.
+Every file is restored to a scratch copy and checked with PRAGMA
+integrity_check before the set is kept.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+SET_PREFIX = "nannyloop-"
+SET_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupReport:
+    def __init__(self, path):
+        self.path = path
+        self.files = 0
+        self.pages = 0
+        self.steps = 0
+        self.restarts = 0
+        self.single_step_files = 0
+        self.bytes_written = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.path}: {self.files} file(s), {self.pages} pages in {self.steps} steps "
+            f"({self.restarts} restarts, {self.single_step_files} single-step), "
+            f"{self.bytes_written / 1024:.0f} KiB, {self.seconds:.2f}s"
+        )
+
+
+def is_wal(path):
+    """Whether a database file is in WAL mode, read from its header without taking a lock."""
+    with open(path, "rb") as f:
+        header = f.read(20)
+    # bytes 18 and 19 are the read/write format versions: 1 = rollback journal, 2 = WAL
+    return len(header) == 20 and header[18] == 2
+
+
+def copy_online(source_path, dest_path, pages=1024, pause=0.005, max_restarts=3,
+                blocking_fallback=False, report=None):
+    """Copy a live database with the backup API, `pages` at a time.
+
+    SQLite restarts a stepped backup whenever another connection writes to
+    the source, so on a busy database the copy could chase writes forever.
+    After `max_restarts` the copy is redone in a single step. On a WAL
+    database that step reads a snapshot while writers carry on. On a
+    rollback-journal database it would block every writer for the whole
+    copy, so it only happens with `blocking_fallback`; otherwise
+    BackupError is raised.
+
+    The copy is switched to the rollback journal so it is a single
+    self-contained file.
+    """
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if report is not None:
+            report.steps += 1
+        # remaining goes back up when another connection wrote to the source
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if report is not None:
+                report.restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    wal = is_wal(source_path)
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        try:
+            source.backup(dest, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            if not wal and not blocking_fallback:
+                raise BackupError(
+                    f"{source_path} kept changing during the stepped backup. It is not in WAL "
+                    f"mode, so a one-step copy would block writers for the whole copy; enable "
+                    f"WAL or allow that with blocking_fallback (--blocking-fallback)"
+                )
+            source.backup(dest, pages=-1)
+            if report is not None:
+                report.single_step_files += 1
+        dest.execute("PRAGMA journal_mode=DELETE")
+        if report is not None:
+            report.pages += dest.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dest.close()
+        source.close()
+
+
+def integrity_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def restore(archive_path, dest_path):
+    """Write a backed-up file (plain or .gz) back out as a database file."""
+    if archive_path.endswith(".gz"):
+        with gzip.open(archive_path, "rb") as src, open(dest_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        shutil.copyfile(archive_path, dest_path)
+
+
+def verify(archive_path):
+    with tempfile.TemporaryDirectory() as scratch:
+        restored = os.path.join(scratch, "restore.db")
+        restore(archive_path, restored)
+        result = integrity_check(restored)
+    if result != ["ok"]:
+        raise BackupError(f"{archive_path} failed integrity_check: {'; '.join(result[:5])}")
+
+
+def backup_file(source_path, dest_path, compress=True, pages=1024, pause=0.005,
+                blocking_fallback=False, report=None):
+    tmp_path = dest_path + ".partial"
+    copy_online(source_path, tmp_path, pages=pages, pause=pause,
+                blocking_fallback=blocking_fallback, report=report)
+    if compress:
+        final_path = dest_path + ".gz"
+        with open(tmp_path, "rb") as src, gzip.open(final_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(tmp_path)
+    else:
+        final_path = dest_path
+        os.replace(tmp_path, final_path)
+    verify(final_path)
+    if report is not None:
+        report.files += 1
+        report.bytes_written += os.path.getsize(final_path)
+    return final_path
+
+
+def backup_set(main_db, dest_dir, shard_dir=None, compress=True, pages=1024, pause=0.005,
+               blocking_fallback=False):
+    """Back up the main database (and shards) into a new timestamped directory."""
+    started = time.perf_counter()
+    set_dir = os.path.join(dest_dir, SET_PREFIX + datetime.utcnow().strftime(SET_FORMAT))
+    base, n = set_dir, 0
+    while os.path.exists(set_dir) or os.path.exists(set_dir + ".partial"):
+        n += 1
+        set_dir = f"{base}-{n}"
+    partial_dir = set_dir + ".partial"
+    os.makedirs(partial_dir)
+    report = BackupReport(set_dir)
+    try:
+        backup_file(main_db, os.path.join(partial_dir, os.path.basename(main_db)),
+                    compress=compress, pages=pages, pause=pause,
+                    blocking_fallback=blocking_fallback, report=report)
+        if shard_dir and os.path.isdir(shard_dir):
+            os.makedirs(os.path.join(partial_dir, "shards"))
+            for name in sorted(os.listdir(shard_dir)):
+                if name.endswith(".db"):
+                    backup_file(os.path.join(shard_dir, name), os.path.join(partial_dir, "shards", name),
+                                compress=compress, pages=pages, pause=pause,
+                                blocking_fallback=blocking_fallback, report=report)
+    except Exception:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+    os.rename(partial_dir, set_dir)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def rotate(dest_dir, keep):
+    """Delete all but the newest `keep` backup sets. Returns the removed paths."""
+    sets = sorted(
+        name for name in os.listdir(dest_dir)
+        if name.startswith(SET_PREFIX) and not name.endswith(".partial")
+    )
+    removed = []
+    for name in sets[:-keep] if keep > 0 else []:
+        path = os.path.join(dest_dir, name)
+        shutil.rmtree(path)
+        removed.append(path)
+    return removed
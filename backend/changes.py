@@ -0,0 +1,163 @@
+# backend/changes.py
+"""Per-household change log for delta sync.
+
+Every flush that inserts, updates or deletes a log, schedule item,
+schedule exception, child or summary appends a row to change_log_entry.
+A soft-deleted schedule item is written as a delete. Clients poll
+/changes?since=<seq> and get back the latest change for each record
+changed after that sequence number.
+
+Records that predate the change log are logged once by
+backfill_change_log(), which init-db runs while the log is still empty.
+"""
+import json
+from datetime import date, datetime
+
+from sqlalchemy import event, func, insert, inspect, select
+
+from backend.models import (
+    db, AISummary, ChangeLogEntry, Child, LogEntry, ScheduleException, ScheduleItem,
+)
+
+TRACKED = {
+    LogEntry: "log",
+    ScheduleItem: "event",
+    ScheduleException: "exception",
+    Child: "child",
+    AISummary: "summary",
+}
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def snapshot(obj):
+    return {attr.key: _jsonable(getattr(obj, attr.key)) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _household_id(session, obj):
+    if isinstance(obj, ScheduleException):
+        item = session.get(ScheduleItem, obj.schedule_item_id)
+        return item.household_id if item is not None else None
+    return obj.household_id
+
+
+def _change(session, obj, deleted):
+    entity = TRACKED.get(type(obj))
+    if entity is None:
+        return None
+    household_id = _household_id(session, obj)
+    if household_id is None:
+        return None
+    if deleted or getattr(obj, "is_deleted", False):
+        op, data = "delete", None
+    else:
+        op, data = "upsert", json.dumps(snapshot(obj), separators=(",", ":"))
+    return {
+        "household_id": household_id,
+        "entity": entity,
+        "entity_id": obj.id,
+        "op": op,
+        "data": data,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def record_changes(session, flush_context):
+    rows = []
+    for obj in session.new:
+        rows.append(_change(session, obj, deleted=False))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            rows.append(_change(session, obj, deleted=False))
+    for obj in session.deleted:
+        rows.append(_change(session, obj, deleted=True))
+    rows = [row for row in rows if row is not None]
+    if rows:
+        session.execute(insert(ChangeLogEntry.__table__), rows)
+
+
+def backfill_change_log(session, batch_size=1000):
+    """Log an upsert for every live tracked row if change_log_entry is empty.
+
+    Without this a client syncing from 0 would never see records created
+    before the change log existed. Returns the number of rows logged.
+    """
+    if session.execute(select(ChangeLogEntry.id).limit(1)).first() is not None:
+        return 0
+    item_households = dict(session.execute(select(ScheduleItem.id, ScheduleItem.household_id)).all())
+    created_at = datetime.utcnow()
+    total = 0
+    for model, entity in TRACKED.items():
+        result = session.execute(select(model).execution_options(yield_per=batch_size)).scalars()
+        for objs in result.partitions():
+            rows = []
+            for obj in objs:
+                if getattr(obj, "is_deleted", False):
+                    continue
+                if isinstance(obj, ScheduleException):
+                    household_id = item_households.get(obj.schedule_item_id)
+                else:
+                    household_id = obj.household_id
+                if household_id is None:
+                    continue
+                rows.append({
+                    "household_id": household_id,
+                    "entity": entity,
+                    "entity_id": obj.id,
+                    "op": "upsert",
+                    "data": json.dumps(snapshot(obj), separators=(",", ":")),
+                    "created_at": created_at,
+                })
+            if rows:
+                session.execute(insert(ChangeLogEntry.__table__), rows)
+                total += len(rows)
+    return total
+
+
+def init_change_log(session_class):
+    if not event.contains(session_class, "after_flush", record_changes):
+        event.listen(session_class, "after_flush", record_changes)
+
+
+def changes_since(household_id, since, limit=500):
+    """Latest change per record with sequence > since, oldest first.
+
+    Returns (changes, next_since, more). Older changes to a record are
+    skipped because the newest one supersedes them.
+    """
+    latest = (
+        select(func.max(ChangeLogEntry.id))
+        .where(ChangeLogEntry.household_id == household_id, ChangeLogEntry.id > since)
+        .group_by(ChangeLogEntry.entity, ChangeLogEntry.entity_id)
+    )
+    stmt = (
+        select(
+            ChangeLogEntry.id,
+            ChangeLogEntry.entity,
+            ChangeLogEntry.entity_id,
+            ChangeLogEntry.op,
+            ChangeLogEntry.data,
+        )
+        .where(ChangeLogEntry.id.in_(latest))
+        .order_by(ChangeLogEntry.id)
+        .limit(limit + 1)
+    )
+    rows = db.session.execute(stmt).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [
+        {
+            "seq": row.id,
+            "entity": row.entity,
+            "id": row.entity_id,
+            "op": row.op,
+            "data": json.loads(row.data) if row.data else None,
+        }
+        for row in rows
+    ]
+    next_since = rows[-1].id if rows else since
+    return changes, next_since, more
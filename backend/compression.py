@@ -0,0 +1,168 @@
+# backend/compression.py
+"""gzip compression for HTML and other text responses.
+
+Registered as an after_request hook. Buffered responses are compressed in
+one go once they pass COMPRESS_MIN_SIZE; streamed responses (see
+render_page in app.py) are compressed chunk by chunk with a sync flush so
+the browser can still render while the page is being generated.
+
+With COMPRESS_STATS_INTERVAL set, the bytes saved and CPU spent since the
+last report are logged every that many seconds, for tuning COMPRESS_LEVEL
+on a running server.
+"""
+import gzip
+import logging
+import threading
+import time
+import zlib
+
+from flask import current_app, request
+
+DEFAULT_MIMETYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+)
+
+
+class CompressionStats:
+    """Running totals for this process, used to tune COMPRESS_LEVEL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.since = time.monotonic()
+
+    def record(self, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+
+    def as_dict(self):
+        with self._lock:
+            return self._as_dict()
+
+    def take(self, interval):
+        """as_dict() and reset, once `interval` seconds have passed since the last reset."""
+        with self._lock:
+            if time.monotonic() - self.since < interval:
+                return None
+            totals = self._as_dict()
+            self._clear()
+            return totals
+
+    def _as_dict(self):
+        ratio = self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+        return {
+            "responses": self.responses,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(ratio, 3),
+            "cpu_ms": round(self.cpu_seconds * 1000, 1),
+        }
+
+
+stats = CompressionStats()
+
+
+def init_compression(app):
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+    app.config.setdefault("COMPRESS_STATS_INTERVAL", 0)
+    if app.config["COMPRESS_STATS_INTERVAL"] and app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
+    app.after_request(compress_response)
+
+
+def _accepts_gzip():
+    return request.accept_encodings["gzip"] > 0
+
+
+def _report(path, bytes_in, bytes_out, cpu_seconds):
+    stats.record(bytes_in, bytes_out, cpu_seconds)
+    current_app.logger.debug(
+        "gzip %s: %d -> %d bytes in %.2f ms CPU", path, bytes_in, bytes_out, cpu_seconds * 1000
+    )
+    interval = current_app.config["COMPRESS_STATS_INTERVAL"]
+    totals = stats.take(interval) if interval else None
+    if totals:
+        current_app.logger.info(
+            "gzip level %d, last %ds: %d responses, %d -> %d bytes (ratio %.3f), %.1f ms CPU",
+            current_app.config["COMPRESS_LEVEL"], interval, totals["responses"],
+            totals["bytes_in"], totals["bytes_out"], totals["ratio"], totals["cpu_ms"],
+        )
+
+
+def _gzip_stream(app, path, chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    bytes_in = 0
+    bytes_out = 0
+    cpu = 0.0
+    for chunk in chunks:
+        started = time.thread_time()
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        cpu += time.thread_time() - started
+        bytes_in += len(chunk)
+        bytes_out += len(data)
+        if data:
+            yield data
+    started = time.thread_time()
+    tail = compressor.flush()
+    cpu += time.thread_time() - started
+    bytes_out += len(tail)
+    yield tail
+    with app.app_context():
+        _report(path, bytes_in, bytes_out, cpu)
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config["COMPRESS_ENABLED"]:
+        return response
+    if response.mimetype not in config["COMPRESS_MIMETYPES"]:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if (
+        not _accepts_gzip()
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.direct_passthrough
+    ):
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    if response.is_streamed:
+        response.response = _gzip_stream(
+            current_app._get_current_object(), request.path, response.iter_encoded(), level
+        )
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        started = time.thread_time()
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+        _report(request.path, len(body), len(compressed), time.thread_time() - started)
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = "gzip"
+    return response
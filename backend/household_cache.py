@@ -0,0 +1,197 @@
+# backend/household_cache.py
+"""Per-household cache for data that almost never changes.
+
+Children, the household name and unused invites are read on nearly every
+page but only change when a parent adds a child or an invite is created or
+used. Each household has a version number; cached values are stored with
+the version they were loaded at, and invalidate_household() bumps the
+version so every process reloads on its next read.
+
+Values live in an in-process LRU. Versions live in the process too by
+default, or in a small shared SQLite file (HOUSEHOLD_CACHE_BACKEND =
+"sqlite") so several worker processes see each other's invalidations.
+A household's version is read once per request and kept on flask.g, so
+a page that reads several cached values makes a single version lookup.
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import select
+
+from backend.models import db, Child, Household, InviteCode
+
+EXTENSION_KEY = "household_cache"
+
+ChildRow = namedtuple("ChildRow", "id name date_of_birth")
+
+InviteRow = namedtuple("InviteRow", "code created_at expires_at used_at")
+
+
+class LocalVersionStore:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, household_id):
+        return self._versions.get(household_id, 0)
+
+    def bump(self, household_id):
+        with self._lock:
+            self._versions[household_id] = self._versions.get(household_id, 0) + 1
+
+
+class SqliteVersionStore:
+    """Household versions in a SQLite file shared by all worker processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS household_version ("
+            "household_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, household_id):
+        row = self._connect().execute(
+            "SELECT version FROM household_version WHERE household_id = ?", (household_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, household_id):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO household_version (household_id, version) VALUES (?, 1) "
+            "ON CONFLICT(household_id) DO UPDATE SET version = version + 1",
+            (household_id,),
+        )
+        conn.commit()
+
+
+class HouseholdCache:
+    def __init__(self, versions, max_entries=1024):
+        self.versions = versions
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, household_id):
+        if not has_app_context():
+            return self.versions.get(household_id)
+        seen = g.setdefault("household_cache_versions", {})
+        if household_id not in seen:
+            seen[household_id] = self.versions.get(household_id)
+        return seen[household_id]
+
+    def get(self, household_id, name, loader):
+        # read the version before loading so a concurrent bump is never hidden
+        version = self.version(household_id)
+        key = (household_id, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, household_id):
+        self.versions.bump(household_id)
+        if has_app_context():
+            g.get("household_cache_versions", {}).pop(household_id, None)
+
+
+def init_household_cache(app):
+    app.config.setdefault("HOUSEHOLD_CACHE_BACKEND", "local")
+    app.config.setdefault("HOUSEHOLD_CACHE_PATH", os.path.join(app.instance_path, "household_cache.db"))
+    app.config.setdefault("HOUSEHOLD_CACHE_SIZE", 1024)
+    if app.config["HOUSEHOLD_CACHE_BACKEND"] == "sqlite":
+        versions = SqliteVersionStore(app.config["HOUSEHOLD_CACHE_PATH"])
+    else:
+        versions = LocalVersionStore()
+    app.extensions[EXTENSION_KEY] = HouseholdCache(versions, app.config["HOUSEHOLD_CACHE_SIZE"])
+
+
+def _cache():
+    return current_app.extensions[EXTENSION_KEY]
+
+
+def invalidate_household(household_id):
+    """Call after committing a change to a household's children, name or invites."""
+    _cache().invalidate(household_id)
+
+
+def household_children(household_id):
+    def load():
+        stmt = (
+            select(Child.id, Child.name, Child.date_of_birth)
+            .where(Child.household_id == household_id)
+            .order_by(Child.id)
+        )
+        return tuple(ChildRow._make(row) for row in db.session.execute(stmt))
+
+    return _cache().get(household_id, "children", load)
+
+
+def household_child(household_id, child_id):
+    """The household's child with `child_id`, or None if it is not theirs."""
+    for child in household_children(household_id):
+        if child.id == child_id:
+            return child
+    return None
+
+
+def household_name(household_id):
+    def load():
+        return db.session.execute(
+            select(Household.name).where(Household.id == household_id)
+        ).scalar()
+
+    return _cache().get(household_id, "name", load)
+
+
+def household_invites(household_id):
+    """Every invite of the household, newest first."""
+    def load():
+        stmt = (
+            select(InviteCode.code, InviteCode.created_at, InviteCode.expires_at, InviteCode.used_at)
+            .where(InviteCode.household_id == household_id)
+            .order_by(InviteCode.created_at.desc())
+        )
+        return tuple(InviteRow._make(row) for row in db.session.execute(stmt))
+
+    return _cache().get(household_id, "invites", load)
+
+
+def latest_invites(household_id, limit=5):
+    return household_invites(household_id)[:limit]
+
+
+def active_invite_count(household_id):
+    # counted per read since invites lapse on their own
+    now = datetime.utcnow()
+    return sum(1 for invite in household_invites(household_id)
+               if invite.used_at is None and (invite.expires_at is None or invite.expires_at > now))
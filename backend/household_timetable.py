@@ -0,0 +1,127 @@
+# backend/household_timetable.py
+"""Household-wide timetable with one lane per child.
+
+The whole range is loaded with three queries (logs, live events, skipped
+dates) however many children or weeks are shown. Each recurring event is
+expanded once over the whole range and every entry is dropped into a
+(day, hour slot, child) cell. Ranges are at most a month and each lane
+shows at most LANE_LIMIT entries, so the cost of a page is bounded.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+from backend.read_models import (
+    TimetableEntry,
+    household_events_between,
+    household_logs_between,
+    skipped_dates_between,
+)
+from backend.scheduling import occurrences_between
+
+HOURS = tuple(range(6, 22, 2))  # 06:00 to 20:00 in 2 hour slots
+
+# range name -> number of days; "month" follows the calendar month
+RANGES = {
+    "week": 7,
+    "2weeks": 14,
+    "4weeks": 28,
+    "month": None,
+}
+
+LANE_LIMIT = 4
+
+
+def slot_for(dt):
+    return min(max((dt.hour // 2) * 2, HOURS[0]), HOURS[-1])
+
+
+def resolve_range(range_name, start_str, today):
+    """Return (start, end, previous start, next start) for a range name and YYYY-MM-DD start.
+
+    Week ranges start on the Monday of the given date and months on the
+    first. Raises ValueError for an unknown range or a malformed date.
+    """
+    if range_name not in RANGES:
+        raise ValueError(f"unknown range {range_name!r}")
+    day = datetime.strptime(start_str, "%Y-%m-%d") if start_str else today
+    day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if range_name == "month":
+        start = day.replace(day=1)
+        end = start + timedelta(days=calendar.monthrange(start.year, start.month)[1])
+        prev_start = (start - timedelta(days=1)).replace(day=1)
+        return start, end, prev_start, end
+
+    start = day - timedelta(days=day.weekday())
+    length = timedelta(days=RANGES[range_name])
+    return start, start + length, start - length, start + length
+
+
+def calendar_weeks(start, end):
+    """Monday-first weeks of dates covering [start, end); days outside are None."""
+    first = start - timedelta(days=start.weekday())
+    weeks = []
+    while first < end:
+        week = []
+        for offset in range(7):
+            day = first + timedelta(days=offset)
+            week.append(day.date() if start <= day < end else None)
+        weeks.append(week)
+        first += timedelta(days=7)
+    return weeks
+
+
+class HouseholdTimetable:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.lanes = {}     # (date, hour slot, child_id) -> entries shown
+        self.overflow = {}  # (date, hour slot, child_id) -> entries not shown
+
+    def add(self, child_id, entry):
+        key = (entry.time.date(), slot_for(entry.time), child_id)
+        self.lanes.setdefault(key, []).append(entry)
+
+    def finish(self, lane_limit=LANE_LIMIT):
+        for key, entries in self.lanes.items():
+            entries.sort(key=lambda e: e.time)
+            if len(entries) > lane_limit:
+                self.overflow[key] = len(entries) - lane_limit
+                del entries[lane_limit:]
+
+
+def build_household_timetable(household_id, children, start, end, lane_limit=LANE_LIMIT):
+    child_ids = {child.id for child in children}
+    timetable = HouseholdTimetable(start, end)
+    skipped_lookup = skipped_dates_between(household_id, start, end)
+
+    for ev in household_events_between(household_id, start, end):
+        if ev.child_id not in child_ids:
+            continue
+        for dt in occurrences_between(ev, start, end, skipped_lookup):
+            timetable.add(ev.child_id, TimetableEntry(
+                kind="event",
+                category=ev.category,
+                time=dt,
+                title=ev.title,
+                notes=ev.notes or "",
+                id=ev.id,
+                end_time=dt + timedelta(minutes=ev.duration_minutes or 0),
+                rrule=ev.rrule,
+                occurrence_date=dt.strftime("%Y-%m-%d"),
+            ))
+
+    for lg in household_logs_between(household_id, start, end):
+        if lg.child_id not in child_ids:
+            continue
+        timetable.add(lg.child_id, TimetableEntry(
+            kind="log",
+            category=lg.category,
+            time=lg.timestamp,
+            title=lg.category,
+            notes=lg.notes,
+            carer=lg.carer_name,
+        ))
+
+    timetable.finish(lane_limit)
+    return timetable
@@ -2,11 +2,38 @@
 from datetime import datetime, timedelta
 import secrets
 
+import sqlalchemy as sa
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from backend.sharding import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# tables that move to a per-household file when sharding is enabled
+HOUSEHOLD_SCOPED = {"info": {"household_scoped": True}}
+
+# columns added to tables that existing databases already have; create_all()
+# only creates missing tables, so init-db adds these with ALTER TABLE
+ADDED_COLUMNS = (
+    ("schedule_item", "duration_minutes", "INTEGER NOT NULL DEFAULT 60"),
+)
+
+
+def add_missing_columns(engine):
+    """Add any ADDED_COLUMNS an existing database lacks. Returns "table.column" names added."""
+    inspector = sa.inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            if column in {c["name"] for c in inspector.get_columns(table)}:
+                continue
+            conn.execute(sa.text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            added.append(f"{table}.{column}")
+    return added
 
 
 class Household(db.Model):
@@ -39,6 +66,8 @@ class User(UserMixin, db.Model):
 
 
 class Child(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
     household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
 
@@ -49,6 +78,8 @@ class Child(db.Model):
 
 
 class LogEntry(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
     household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
 
@@ -61,6 +92,8 @@ class LogEntry(db.Model):
 
 
 class InviteCode(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(32), unique=True, nullable=False, index=True)
 
@@ -96,6 +129,8 @@ class InviteCode(db.Model):
 
 
 class ScheduleItem(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
 
 
@@ -109,6 +144,7 @@ class ScheduleItem(db.Model):
 
 
     start_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60)
     rrule = db.Column(db.String(300), nullable=True)  # e.g. "FREQ=DAILY;INTERVAL=1"
     repeat_until = db.Column(db.DateTime, nullable=True)
 
@@ -121,7 +157,13 @@ class ScheduleItem(db.Model):
 
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
 
+    @property
+    def end_time(self):
+        return self.start_time + timedelta(minutes=self.duration_minutes or 0)
+
 class ScheduleException(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
 
     schedule_item_id = db.Column(
@@ -133,6 +175,8 @@ class ScheduleException(db.Model):
     skipped_date = db.Column(db.Date, nullable=False)
 
 class AISummary(db.Model):
+    __table_args__ = HOUSEHOLD_SCOPED
+
     id = db.Column(db.Integer, primary_key=True)
 
     household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
@@ -148,3 +192,24 @@ class AISummary(db.Model):
 
     
 
+
+class ChangeLogEntry(db.Model):
+    # id doubles as the sync sequence; AUTOINCREMENT keeps it from ever going backwards
+    __table_args__ = (
+        db.Index("ix_change_log_entity", "household_id", "entity", "entity_id"),
+        {**HOUSEHOLD_SCOPED, "sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False, index=True)
+
+    # "log", "event", "exception", "child" or "summary"
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+
+    # "upsert" or "delete"; deletes are tombstones with no data
+    op = db.Column(db.String(10), nullable=False)
+    data = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,152 @@
+# backend/read_models.py
+"""Column-only queries for read-heavy pages.
+
+These select just the columns a template prints and return plain tuples,
+so listing thousands of rows never builds ORM objects or identity-map
+entries. Writes still go through the models in backend/models.py.
+"""
+from collections import namedtuple
+
+from sqlalchemy import and_, or_, select
+
+from backend.models import db, AISummary, Child, LogEntry, ScheduleException, ScheduleItem
+
+LogRow = namedtuple("LogRow", "child_name category carer_name notes timestamp")
+
+SummaryRow = namedtuple("SummaryRow", "child_name week_start summary_text")
+
+EventRow = namedtuple(
+    "EventRow", "id category title notes start_time duration_minutes rrule repeat_until"
+)
+
+HouseholdLogRow = namedtuple("HouseholdLogRow", "child_id category carer_name notes timestamp")
+
+ChildEventRow = namedtuple("ChildEventRow", ("child_id",) + EventRow._fields)
+
+# one entry in a timetable cell, either a logged activity or an event occurrence
+TimetableEntry = namedtuple(
+    "TimetableEntry",
+    "kind category time title notes id end_time rrule occurrence_date carer",
+    defaults=(None, None, None, None, None),
+)
+
+
+def household_logs(household_id, batch_size=500):
+    """Newest-first logs for the dashboard, fetched in batches as they are iterated."""
+    stmt = (
+        select(Child.name, LogEntry.category, LogEntry.carer_name, LogEntry.notes, LogEntry.timestamp)
+        .join(Child, Child.id == LogEntry.child_id)
+        .where(LogEntry.household_id == household_id)
+        .order_by(LogEntry.timestamp.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(stmt):
+        yield LogRow._make(row)
+
+
+def household_summaries(household_id):
+    stmt = (
+        select(Child.name, AISummary.week_start, AISummary.summary_text)
+        .join(Child, Child.id == AISummary.child_id)
+        .where(AISummary.household_id == household_id)
+        .order_by(AISummary.created_at.desc())
+    )
+    return [SummaryRow._make(row) for row in db.session.execute(stmt)]
+
+
+def child_logs_between(household_id, child_id, start, end):
+    stmt = (
+        select(LogEntry.category, LogEntry.carer_name, LogEntry.notes, LogEntry.timestamp)
+        .where(
+            LogEntry.household_id == household_id,
+            LogEntry.child_id == child_id,
+            LogEntry.timestamp >= start,
+            LogEntry.timestamp < end,
+        )
+        .order_by(LogEntry.timestamp.asc())
+    )
+    return db.session.execute(stmt).all()
+
+
+def child_events(household_id, child_id):
+    """Live (not soft-deleted) schedule items of a child, oldest first."""
+    stmt = (
+        select(
+            ScheduleItem.id,
+            ScheduleItem.category,
+            ScheduleItem.title,
+            ScheduleItem.notes,
+            ScheduleItem.start_time,
+            ScheduleItem.duration_minutes,
+            ScheduleItem.rrule,
+            ScheduleItem.repeat_until,
+        )
+        .where(
+            ScheduleItem.household_id == household_id,
+            ScheduleItem.child_id == child_id,
+            ScheduleItem.is_deleted.is_(False),
+        )
+        .order_by(ScheduleItem.start_time.asc())
+    )
+    return [EventRow._make(row) for row in db.session.execute(stmt)]
+
+
+def household_logs_between(household_id, start, end):
+    """Logs of every child in the household in [start, end), oldest first."""
+    stmt = (
+        select(LogEntry.child_id, LogEntry.category, LogEntry.carer_name, LogEntry.notes, LogEntry.timestamp)
+        .where(
+            LogEntry.household_id == household_id,
+            LogEntry.timestamp >= start,
+            LogEntry.timestamp < end,
+        )
+        .order_by(LogEntry.timestamp.asc())
+    )
+    return [HouseholdLogRow._make(row) for row in db.session.execute(stmt)]
+
+
+def household_events_between(household_id, start, end):
+    """Live events of every child that can have an occurrence in [start, end)."""
+    stmt = (
+        select(
+            ScheduleItem.child_id,
+            ScheduleItem.id,
+            ScheduleItem.category,
+            ScheduleItem.title,
+            ScheduleItem.notes,
+            ScheduleItem.start_time,
+            ScheduleItem.duration_minutes,
+            ScheduleItem.rrule,
+            ScheduleItem.repeat_until,
+        )
+        .where(
+            ScheduleItem.household_id == household_id,
+            ScheduleItem.is_deleted.is_(False),
+            ScheduleItem.start_time < end,
+            or_(
+                and_(ScheduleItem.rrule.is_(None), ScheduleItem.start_time >= start),
+                and_(
+                    ScheduleItem.rrule.is_not(None),
+                    or_(ScheduleItem.repeat_until.is_(None), ScheduleItem.repeat_until >= start),
+                ),
+            ),
+        )
+        .order_by(ScheduleItem.start_time.asc())
+    )
+    return [ChildEventRow._make(row) for row in db.session.execute(stmt)]
+
+
+def skipped_dates_between(household_id, start, end, child_id=None):
+    """{(schedule_item_id, skipped_date)} for the household's events on the days from start to end."""
+    stmt = (
+        select(ScheduleException.schedule_item_id, ScheduleException.skipped_date)
+        .join(ScheduleItem, ScheduleItem.id == ScheduleException.schedule_item_id)
+        .where(
+            ScheduleItem.household_id == household_id,
+            ScheduleException.skipped_date >= start.date(),
+            ScheduleException.skipped_date <= end.date(),
+        )
+    )
+    if child_id is not None:
+        stmt = stmt.where(ScheduleItem.child_id == child_id)
+    return {tuple(row) for row in db.session.execute(stmt)}
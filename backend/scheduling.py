@@ -0,0 +1,211 @@
+# backend/scheduling.py
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from backend.models import db, ScheduleItem, ScheduleException
+
+DEFAULT_DURATION_MINUTES = 60
+MAX_DURATION_MINUTES = 24 * 60
+
+# days between occurrences; 0 means the item does not repeat
+RRULE_PERIOD_DAYS = {
+    None: 0,
+    "FREQ=DAILY": 1,
+    "FREQ=WEEKLY": 7,
+}
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def occurrences_between(item, window_start, window_end, skipped_lookup):
+    """Start times of `item` that fall in [window_start, window_end)."""
+    period = RRULE_PERIOD_DAYS.get(item.rrule)
+    if period is None:
+        return []
+
+    if period == 0:
+        if window_start <= item.start_time < window_end:
+            return [item.start_time]
+        return []
+
+    step = timedelta(days=period)
+    current_dt = item.start_time
+    if current_dt < window_start:
+        # jump straight to the first occurrence inside the window
+        behind = (window_start - current_dt).days // period
+        current_dt += step * behind
+        while current_dt < window_start:
+            current_dt += step
+
+    times = []
+    while current_dt < window_end:
+        if item.repeat_until is not None and current_dt > item.repeat_until:
+            break
+        if (item.id, current_dt.date()) not in skipped_lookup:
+            times.append(current_dt)
+        current_dt += step
+    return times
+
+
+class Series:
+    """One schedule item reduced to day/minute arithmetic for conflict checks."""
+
+    __slots__ = ("item_id", "title", "first_day", "last_day", "period",
+                 "start_minute", "duration", "skipped")
+
+    def __init__(self, item_id, title, start_time, rrule, repeat_until,
+                 duration_minutes, skipped_days=()):
+        self.item_id = item_id
+        self.title = title
+        self.first_day = start_time.toordinal()
+        self.period = RRULE_PERIOD_DAYS.get(rrule, 0)
+        self.start_minute = start_time.hour * 60 + start_time.minute
+        self.duration = duration_minutes or DEFAULT_DURATION_MINUTES
+        self.skipped = set(skipped_days)
+
+        if self.period == 0:
+            self.last_day = self.first_day
+        elif repeat_until is None:
+            self.last_day = None
+        else:
+            # the last day whose occurrence still starts on or before repeat_until
+            last = repeat_until.toordinal()
+            if datetime.combine(repeat_until.date(), start_time.time()) > repeat_until:
+                last -= 1
+            self.last_day = last
+
+    def on_day(self, day):
+        if day < self.first_day or day in self.skipped:
+            return False
+        if self.last_day is not None and day > self.last_day:
+            return False
+        if self.period == 0:
+            return day == self.first_day
+        return (day - self.first_day) % self.period == 0
+
+    def first_shared_day(self, other, shift):
+        """First day D on which self occurs and `other` occurs on D + shift."""
+        lo = max(self.first_day, other.first_day - shift)
+        hi = self.last_day
+        if other.last_day is not None:
+            hi = other.last_day - shift if hi is None else min(hi, other.last_day - shift)
+        if hi is not None and lo > hi:
+            return None
+
+        if self.period == 0 or other.period == 0:
+            day = self.first_day if self.period == 0 else other.first_day - shift
+            if lo <= day and (hi is None or day <= hi) and self.on_day(day) and other.on_day(day + shift):
+                return day
+            return None
+
+        step = max(self.period, other.period)  # periods are 1 or 7, so this is the lcm
+        day = None
+        for candidate in range(lo, lo + step):
+            if (candidate - self.first_day) % self.period == 0 and \
+                    (candidate + shift - other.first_day) % other.period == 0:
+                day = candidate
+                break
+        if day is None:
+            return None
+
+        # every miss below is a skipped date, so this loop is bounded by the exceptions
+        while hi is None or day <= hi:
+            if day not in self.skipped and day + shift not in other.skipped:
+                return day
+            day += step
+        return None
+
+
+class ConflictIndex:
+    """Existing series of one child, indexed by start minute of the day.
+
+    Occurrences are at most a day long, so an occurrence of one series can
+    only overlap an occurrence of another on the same day or one day either
+    side. For each of those three shifts the index finds the series whose
+    time-of-day interval overlaps, then checks the day patterns exactly.
+    """
+
+    def __init__(self, series):
+        self.series = sorted(series, key=lambda s: s.start_minute)
+        self.starts = [s.start_minute for s in self.series]
+        self.max_duration = max((s.duration for s in self.series), default=0)
+
+    def overlapping_times(self, lo, hi):
+        """Series whose [start, start + duration) overlaps [lo, hi) in minutes."""
+        first = bisect_left(self.starts, lo - self.max_duration + 1)
+        last = bisect_left(self.starts, hi, first)
+        for i in range(first, last):
+            s = self.series[i]
+            if s.start_minute + s.duration > lo:
+                yield s
+
+    def find_conflict(self, candidate):
+        """Return (series, datetime) for the earliest clash with `candidate`, or None."""
+        best = None
+        for shift in (-1, 0, 1):
+            offset = shift * MINUTES_PER_DAY
+            lo = candidate.start_minute - offset
+            hi = candidate.start_minute + candidate.duration - offset
+            for other in self.overlapping_times(lo, hi):
+                if other.item_id == candidate.item_id:
+                    continue
+                day = candidate.first_shared_day(other, shift)
+                if day is None:
+                    continue
+                when = datetime.fromordinal(day + shift) + timedelta(minutes=other.start_minute)
+                if best is None or when < best[1]:
+                    best = (other, when)
+        return best
+
+
+def load_conflict_index(household_id, child_id):
+    items = (
+        db.session.query(
+            ScheduleItem.id,
+            ScheduleItem.title,
+            ScheduleItem.start_time,
+            ScheduleItem.rrule,
+            ScheduleItem.repeat_until,
+            ScheduleItem.duration_minutes,
+        )
+        .filter_by(household_id=household_id, child_id=child_id, is_deleted=False)
+        .all()
+    )
+
+    skipped = {}
+    recurring_ids = [row.id for row in items if row.rrule]
+    if recurring_ids:
+        exceptions = (
+            db.session.query(ScheduleException.schedule_item_id, ScheduleException.skipped_date)
+            .filter(ScheduleException.schedule_item_id.in_(recurring_ids))
+            .all()
+        )
+        for item_id, skipped_date in exceptions:
+            skipped.setdefault(item_id, []).append(skipped_date.toordinal())
+
+    return ConflictIndex(
+        Series(row.id, row.title, row.start_time, row.rrule, row.repeat_until,
+               row.duration_minutes, skipped.get(row.id, ()))
+        for row in items
+    )
+
+
+def find_schedule_conflict(household_id, child_id, start_time, duration_minutes,
+                           rrule=None, repeat_until=None, item_id=None):
+    """Check a new or edited event against the child's other events.
+
+    Returns (title, datetime) of the first clashing occurrence, or None.
+    """
+    index = load_conflict_index(household_id, child_id)
+    skipped = ()
+    if item_id is not None and rrule:
+        skipped = [
+            ex.skipped_date.toordinal()
+            for ex in ScheduleException.query.filter_by(schedule_item_id=item_id).all()
+        ]
+    candidate = Series(item_id, None, start_time, rrule, repeat_until, duration_minutes, skipped)
+    found = index.find_conflict(candidate)
+    if found is None:
+        return None
+    other, when = found
+    return other.title, when
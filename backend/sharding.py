@@ -0,0 +1,227 @@
+# backend/sharding.py
+"""Optional per-household SQLite shards.
+
+With SHARDING_ENABLED, Household and User stay in the main database (the
+"directory") and every table marked ``info={"household_scoped": True}`` in
+models.py lives in its own file per household under SHARD_DIR. Writes in
+one household then only take that household's SQLite write lock.
+
+Queries are routed by the household selected with use_household(), which
+app.py does for every logged-in request.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+EXTENSION_KEY = "household_shards"
+
+
+class ShardingError(Exception):
+    pass
+
+
+def enable_wal(engine):
+    """Use WAL journaling so readers (eg a page still streaming) never block writers."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @sa.event.listens_for(engine, "connect")
+    def set_journal_mode(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+def is_household_scoped(table):
+    return bool(table.info.get("household_scoped"))
+
+
+class ShardRouter:
+    """Opens and caches one engine per household shard file."""
+
+    def __init__(self, shard_dir, metadata, max_open=128, wal=False):
+        self.shard_dir = shard_dir
+        self.wal = wal
+        self.tables = [t for t in metadata.sorted_tables if is_household_scoped(t)]
+        self.metadata = metadata
+        self.max_open = max_open
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def path_for(self, household_id):
+        return os.path.join(self.shard_dir, f"household_{int(household_id)}.db")
+
+    def engine_for(self, household_id):
+        with self._lock:
+            engine = self._engines.get(household_id)
+            if engine is not None:
+                self._engines.move_to_end(household_id)
+                return engine
+
+            engine = sa.create_engine("sqlite:///" + self.path_for(household_id))
+            if self.wal:
+                enable_wal(engine)
+            self.metadata.create_all(engine, tables=self.tables)
+            self._engines[household_id] = engine
+
+            # least recently used shards give their file handles back
+            while len(self._engines) > self.max_open:
+                _, stale = self._engines.popitem(last=False)
+                stale.dispose()
+            return engine
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+class RoutingSession(Session):
+    """Sends household-scoped tables to the current household's shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get(EXTENSION_KEY)
+            if router is not None and _touches_household_tables(mapper, clause):
+                return router.engine_for(current_household_id())
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _touches_household_tables(mapper, clause):
+    if mapper is not None:
+        return is_household_scoped(sa.inspect(mapper).local_table)
+    if clause is not None:
+        return any(is_household_scoped(t) for t in find_tables(clause, include_crud=True))
+    return False
+
+
+def init_sharding(app, db):
+    app.config.setdefault("SHARDING_ENABLED", False)
+    app.config.setdefault("SHARD_DIR", os.path.join(app.instance_path, "shards"))
+    app.config.setdefault("SHARD_MAX_OPEN", 128)
+    app.config.setdefault("SQLITE_WAL", True)
+    if app.config["SQLITE_WAL"]:
+        with app.app_context():
+            enable_wal(db.engine)
+    if app.config["SHARDING_ENABLED"]:
+        app.extensions[EXTENSION_KEY] = ShardRouter(
+            app.config["SHARD_DIR"], db.metadata, app.config["SHARD_MAX_OPEN"],
+            wal=app.config["SQLITE_WAL"],
+        )
+
+
+def sharding_enabled():
+    return EXTENSION_KEY in current_app.extensions
+
+
+def shard_exists(household_id):
+    return os.path.exists(current_app.extensions[EXTENSION_KEY].path_for(household_id))
+
+
+def use_household(household_id):
+    """Route household-scoped queries in this app context to `household_id`."""
+    g.shard_household_id = household_id
+
+
+def current_household_id():
+    household_id = g.get("shard_household_id")
+    if household_id is None:
+        raise RuntimeError("No household selected for a household-scoped query; call use_household() first.")
+    return household_id
+
+
+# invite codes are typed in before the carer has a household, so the
+# directory keeps a code -> household map to find the right shard
+directory_metadata = sa.MetaData()
+invite_routes = sa.Table(
+    "invite_route",
+    directory_metadata,
+    sa.Column("code", sa.String(32), primary_key=True),
+    sa.Column("household_id", sa.Integer, nullable=False),
+)
+
+
+def create_directory_tables(engine):
+    directory_metadata.create_all(engine)
+
+
+def add_invite_route(session, code, household_id):
+    session.execute(invite_routes.insert().values(code=code, household_id=household_id))
+
+
+def household_for_invite(session, code):
+    return session.execute(
+        sa.select(invite_routes.c.household_id).where(invite_routes.c.code == code)
+    ).scalar()
+
+
+def nonempty_shards(router, household_ids):
+    """Household ids whose shard file already holds rows."""
+    found = []
+    for household_id in household_ids:
+        if not os.path.exists(router.path_for(household_id)):
+            continue
+        with router.engine_for(household_id).connect() as shard:
+            if any(shard.execute(sa.select(table).limit(1)).first() for table in router.tables):
+                found.append(household_id)
+    return found
+
+
+def split_into_shards(source_engine, router, batch_size=1000, force=False):
+    """Copy each household's rows from a single database into its shard.
+
+    Meant to be run once, before switching SHARDING_ENABLED on. Existing
+    shards hold the live data after that, so a shard that already has rows
+    raises ShardingError unless `force` is set, in which case it is emptied
+    and overwritten from the source. The source database is left untouched.
+    Returns {household_id: rows copied}.
+    """
+    tables = {t.name: t for t in router.tables}
+    schedule_items = tables["schedule_item"]
+    copied = {}
+
+    create_directory_tables(source_engine)
+    with source_engine.connect() as source:
+        household_ids = source.execute(sa.text("SELECT id FROM household ORDER BY id")).scalars().all()
+        if not force:
+            occupied = nonempty_shards(router, household_ids)
+            if occupied:
+                raise ShardingError(
+                    f"{len(occupied)} shard(s) already hold data (households "
+                    f"{', '.join(map(str, occupied[:10]))}); refusing to overwrite them"
+                )
+
+        for household_id in household_ids:
+            item_ids = sa.select(schedule_items.c.id).where(schedule_items.c.household_id == household_id)
+            total = 0
+            with router.engine_for(household_id).begin() as shard:
+                for table in reversed(router.tables):
+                    shard.execute(table.delete())
+                for table in router.tables:
+                    if "household_id" in table.c:
+                        query = table.select().where(table.c.household_id == household_id)
+                    else:
+                        query = table.select().where(table.c.schedule_item_id.in_(item_ids))
+                    result = source.execution_options(yield_per=batch_size).execute(query)
+                    for rows in result.mappings().partitions():
+                        shard.execute(table.insert(), [dict(row) for row in rows])
+                        total += len(rows)
+            copied[household_id] = total
+
+        invites = tables["invite_code"]
+        routes = source.execute(sa.select(invites.c.code, invites.c.household_id)).all()
+
+    with source_engine.begin() as directory:
+        # only the copied households' routes are replaced
+        if household_ids:
+            directory.execute(invite_routes.delete().where(invite_routes.c.household_id.in_(household_ids)))
+        if routes:
+            directory.execute(invite_routes.insert(), [
+                {"code": code, "household_id": household_id} for code, household_id in routes
+            ])
+    return copied
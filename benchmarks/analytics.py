@@ -0,0 +1,96 @@
+# benchmarks/analytics.py
+"""Time to analyse a year of one child's logs with backend/analytics.py.
+
+Seeds a throwaway database with `--per-day` logs a day for `--days` days
+and reports the best of `--repeat` runs for the column query alone and for
+the whole report (query plus NumPy work).
+
+    python -m benchmarks.analytics --days 365 --per-day 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.template_render import CATEGORIES
+
+
+def seed_year(db, models, days, per_day):
+    household = models.Household(name="Benchmark household")
+    db.session.add(household)
+    db.session.commit()
+    child = models.Child(household_id=household.id, name="Child", date_of_birth="01/01/2022")
+    db.session.add(child)
+    db.session.commit()
+
+    rng = random.Random(1)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for day in range(days):
+        midnight = today - timedelta(days=day)
+        for _ in range(per_day):
+            rows.append({
+                "household_id": household.id,
+                "child_id": child.id,
+                "carer_name": "Carer",
+                "category": rng.choice(CATEGORIES),
+                "notes": "",
+                "timestamp": midnight + timedelta(minutes=rng.randrange(24 * 60)),
+            })
+    db.session.execute(db.insert(models.LogEntry), rows)
+    db.session.commit()
+    return household.id, child.id
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=20, help="logs per day")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+
+    from backend.app import app
+    from backend import analytics, models
+
+    with app.app_context():
+        models.db.create_all()
+        household_id, child_id = seed_year(models.db, models, args.days, args.per_day)
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=args.days - 1)
+        end = today + timedelta(days=1)
+
+        query, (times, _) = best_of(
+            lambda: analytics.load_log_columns(household_id, child_id, start, end), args.repeat
+        )
+        total, report = best_of(
+            lambda: analytics.analyze_child(household_id, child_id, args.days), args.repeat
+        )
+
+    print(f"{times.size} logs over {args.days} days")
+    print(f"{'query':<8}{query * 1000:>8.1f} ms")
+    print(f"{'numpy':<8}{(total - query) * 1000:>8.1f} ms")
+    print(f"{'total':<8}{total * 1000:>8.1f} ms")
+    print(f"{len(report['anomalies'])} anomalous days, "
+          f"sleep drift {report['sleep_timing']['drift_minutes_per_week']} min/week")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
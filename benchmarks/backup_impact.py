@@ -0,0 +1,106 @@
+# benchmarks/backup_impact.py
+"""Write latency seen by add_log-style commits while a backup runs.
+
+A writer thread commits a log entry every --interval seconds for three
+phases: no backup, a one-step backup copy, and the stepped online backup
+used by `flask backup-db`. Run with SQLITE_WAL=0 to compare against the
+rollback journal.
+
+    python -m benchmarks.backup_impact --logs 100000
+    SQLITE_WAL=0 python -m benchmarks.backup_impact --logs 100000 --blocking-fallback
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.shard_writes import percentile
+from benchmarks.template_render import seed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=100000, help="log entries to seed")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between writes")
+    parser.add_argument("--pages", type=int, default=1024)
+    parser.add_argument("--pause", type=float, default=0.005)
+    parser.add_argument("--dir", help="where to create the databases (default: system temp dir)")
+    parser.add_argument("--blocking-fallback", action="store_true",
+                        help="let a rollback-journal (SQLITE_WAL=0) backup fall back to one blocking step")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-", dir=args.dir)
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+
+    from sqlalchemy.exc import OperationalError
+
+    from backend.app import app
+    from backend import models
+    from backend.backup import BackupError, backup_set
+
+    with app.app_context():
+        models.db.create_all()
+        seed(models.db, models, args.logs, 1)
+        household_id = models.Household.query.first().id
+        child_id = models.Child.query.first().id
+        main_db = models.db.engine.url.database
+
+    latencies = []
+    failures = [0]
+    stop = threading.Event()
+
+    def writer():
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    models.db.session.add(models.LogEntry(
+                        household_id=household_id, child_id=child_id, carer_name="Carer",
+                        category="Diet", notes="Snack.", timestamp=datetime.utcnow(),
+                    ))
+                    models.db.session.commit()
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    models.db.session.rollback()
+                    failures[0] += 1
+                time.sleep(args.interval)
+
+    def phase(name, action):
+        latencies.clear()
+        failures[0] = 0
+        stop.clear()
+        thread = threading.Thread(target=writer)
+        thread.start()
+        time.sleep(0.5)
+        try:
+            detail = action()
+        finally:
+            stop.set()
+            thread.join()
+        print(f"{name:<10}{len(latencies):>7}{percentile(latencies, 50) * 1000:>9.2f}"
+              f"{percentile(latencies, 99) * 1000:>9.2f}{max(latencies, default=0) * 1000:>9.2f}"
+              f"{failures[0]:>7}  {detail}")
+
+    def run_backup(pages, pause):
+        try:
+            report = backup_set(main_db, os.path.join(workdir, "backups"), compress=True, pages=pages,
+                                pause=pause, blocking_fallback=args.blocking_fallback)
+        except BackupError as exc:
+            return f"failed: {exc}"
+        return (f"{report.seconds:.2f}s, {report.steps} steps, {report.restarts} restarts, "
+                f"{report.single_step_files} fell back to one step")
+
+    print(f"{args.logs} logs, {os.path.getsize(main_db) / 2**20:.1f} MiB, write every {args.interval * 1000:.0f} ms")
+    print(f"{'phase':<10}{'writes':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'failed':>7}  backup")
+    phase("idle", lambda: (time.sleep(3), "-")[1])
+    phase("one-step", lambda: run_backup(-1, 0))
+    phase("stepped", lambda: run_backup(args.pages, args.pause))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# benchmarks/compression.py
+"""Bytes sent and gzip CPU time per COMPRESS_LEVEL for the large pages.
+
+    python -m benchmarks.compression --logs 5000
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+
+from benchmarks.template_render import seed
+
+
+def fetch(client, url, encoding):
+    response = client.get(url, headers={"Accept-Encoding": encoding})
+    return response.headers.get("Content-Encoding"), response.get_data()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=5000, help="log entries per child")
+    parser.add_argument("--children", type=int, default=2)
+    parser.add_argument("--levels", default="1,3,6,9")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+
+    from backend.app import app
+    from backend import models
+    from backend.compression import stats
+
+    with app.app_context():
+        models.db.create_all()
+        seed(models.db, models, args.logs, args.children)
+
+    client = app.test_client()
+    client.post("/login", data={"email": "bench@example.com", "password": "bench"})
+
+    print(f"{args.children} children x {args.logs} logs")
+    print(f"{'page':<12}{'mode':<8}{'level':>6}{'raw KiB':>9}{'sent KiB':>10}{'ratio':>7}{'cpu ms':>8}")
+    for url in ("/dashboard", "/timetable"):
+        for streamed in (False, True):
+            app.config["STREAM_TEMPLATES"] = streamed
+            _, raw = fetch(client, url, "identity")
+            for level in (int(x) for x in args.levels.split(",")):
+                app.config["COMPRESS_LEVEL"] = level
+                stats.reset()
+                encoding, body = fetch(client, url, "gzip, deflate")
+                if encoding == "gzip":
+                    assert gzip.decompress(body) == raw
+                totals = stats.as_dict()
+                print(f"{url:<12}{'stream' if streamed else 'buffer':<8}{level:>6}"
+                      f"{len(raw) / 1024:>9.1f}{len(body) / 1024:>10.1f}"
+                      f"{len(body) / len(raw):>7.3f}{totals['cpu_ms']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
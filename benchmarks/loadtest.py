@@ -0,0 +1,386 @@
+# benchmarks/loadtest.py
+"""Morning-rush load test against a locally started NannyLoop server.
+
+Starts the real app with `flask run` on a scratch database, registers
+households over HTTP (one parent, a child and some carers each) and then
+drives them with concurrent virtual users:
+
+- carers mostly post add_log and glance at the dashboard,
+- parents browse the dashboard and page through timetable weeks, and
+  now and then generate a summary or log out and back in.
+
+Results are printed every --report-every seconds. The columns are
+requests/s, latency percentiles, HTTP errors and "database is locked"
+lines in the server log.
+
+    python -m benchmarks.loadtest --users 40 --ramp 20 --duration 60
+    python -m benchmarks.loadtest --find-saturation --stage-seconds 20
+"""
+import argparse
+import http.cookiejar
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+from benchmarks.shard_writes import percentile
+
+CATEGORIES = ["Diet", "Sleep", "Behaviour", "Medical", "Other"]
+
+CARER_MIX = [("add_log", 60), ("dashboard", 25), ("timetable", 15)]
+PARENT_MIX = [
+    ("dashboard", 35),
+    ("timetable_week", 35),
+    ("add_log", 10),
+    ("generate_summary", 10),
+    ("login", 10),
+]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # time each action on its own; the page a browser lands on is its own request
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Client:
+    def __init__(self, base_url, follow_redirects=False, timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout
+        handlers = [urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())]
+        if not follow_redirects:
+            handlers.append(_NoRedirect())
+        self.opener = urllib.request.build_opener(*handlers)
+
+    def request(self, path, data=None, headers=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+
+class Household:
+    def __init__(self, parent_email, carer_emails, child_id):
+        self.parent_email = parent_email
+        self.carer_emails = carer_emails
+        self.child_id = child_id
+
+
+PASSWORD = "load-test-password"
+
+
+def create_household(base_url, index, carers):
+    parent = Client(base_url, follow_redirects=True)
+    parent_email = f"parent{index}@loadtest.local"
+    parent.request("/register-parent", {
+        "email": parent_email, "password": PASSWORD, "household_name": f"Load {index}",
+    })
+    parent.request("/add_child", {"name": f"Child {index}", "dob": "01/01/2022"})
+    _, page = parent.request("/dashboard")
+    child_id = int(re.search(rb'<option value="(\d+)">', page).group(1))
+
+    carer_emails = []
+    for c in range(carers):
+        _, page = parent.request("/create_invite", {"hours": ""})
+        code = re.search(rb"<li>\s*<strong>([^<]+)</strong>", page).group(1).decode()
+        email = f"carer{index}-{c}@loadtest.local"
+        Client(base_url).request("/register-carer", {
+            "invite_code": code, "email": email, "password": PASSWORD,
+        })
+        carer_emails.append(email)
+    return Household(parent_email, carer_emails, child_id)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = []
+
+    def add(self, name, started, latency, status):
+        with self._lock:
+            self._samples.append((started, name, latency, status))
+
+    def drain(self):
+        with self._lock:
+            samples, self._samples = self._samples, []
+        return samples
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, household, role, email, think, recorder, stop):
+        super().__init__(daemon=True)
+        self.client = Client(base_url)
+        self.household = household
+        self.role = role
+        self.email = email
+        self.think = think
+        self.recorder = recorder
+        self.stop = stop
+        self.rng = random.Random()
+        names, weights = zip(*(CARER_MIX if role == "carer" else PARENT_MIX))
+        self.actions = names
+        self.weights = weights
+
+    def timed(self, name, path, data=None):
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            status, _ = self.client.request(path, data, headers={"Accept-Encoding": "gzip"})
+        except (urllib.error.URLError, socket.timeout, ConnectionError):
+            status = 0
+        self.recorder.add(name, started, time.perf_counter() - t0, status)
+
+    def login(self):
+        self.timed("login", "/login", {"email": self.email, "password": PASSWORD})
+
+    def run(self):
+        self.login()
+        while not self.stop.is_set():
+            action = self.rng.choices(self.actions, self.weights)[0]
+            if action == "add_log":
+                self.timed("add_log", "/add_log", {
+                    "child_id": self.household.child_id,
+                    "carer": self.email.split("@")[0],
+                    "category": self.rng.choice(CATEGORIES),
+                    "notes": "Ate most of breakfast and played with blocks.",
+                    "when": "",
+                })
+            elif action == "dashboard":
+                self.timed("dashboard", "/dashboard")
+            elif action == "timetable":
+                self.timed("timetable", f"/timetable?child_id={self.household.child_id}")
+            elif action == "timetable_week":
+                monday = datetime.utcnow() - timedelta(days=datetime.utcnow().weekday())
+                week = (monday + timedelta(weeks=self.rng.randint(-4, 4))).strftime("%Y-%m-%d")
+                self.timed("timetable", f"/timetable?child_id={self.household.child_id}&week={week}")
+            elif action == "generate_summary":
+                self.timed("generate_summary", "/generate_summary", {"child_id": self.household.child_id})
+            elif action == "login":
+                self.client.request("/logout")
+                self.login()
+            self.stop.wait(self.rng.expovariate(1 / self.think) if self.think else 0)
+
+
+class Server:
+    def __init__(self, workdir, port, sharded):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.log_path = os.path.join(workdir, "server.log")
+        self.env = dict(os.environ)
+        self.env.update({
+            "DATABASE_URL": "sqlite:///" + os.path.join(workdir, "loadtest.db"),
+            "TEMPLATE_CACHE_DIR": os.path.join(workdir, "jinja_cache"),
+            "SHARD_DIR": os.path.join(workdir, "shards"),
+            "SHARDING_ENABLED": "1" if sharded else "0",
+        })
+        self.process = None
+        self._log_offset = 0
+
+    def start(self):
+        flask = [sys.executable, "-m", "flask", "--app", "backend.app"]
+        subprocess.run(flask + ["init-db"], env=self.env, check=True, capture_output=True)
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            flask + ["run", "--port", str(self.port), "--with-threads"],
+            env=self.env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"server did not start; see {self.log_path}")
+
+    def new_lock_errors(self):
+        with open(self.log_path, "rb") as log:
+            log.seek(self._log_offset)
+            chunk = log.read()
+            self._log_offset += len(chunk)
+        return chunk.count(b"database is locked")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+            self._log.close()
+
+
+def summarize(samples, seconds, lock_errors):
+    latencies = [s[2] for s in samples]
+    errors = sum(1 for s in samples if s[3] == 0 or s[3] >= 500)
+    return {
+        "requests": len(samples),
+        "rps": (len(samples) - errors) / seconds if seconds else 0.0,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "locks": lock_errors,
+    }
+
+
+HEADER = f"{'t':>5}{'users':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'locked':>8}"
+
+
+def print_row(elapsed, users, stats):
+    print(f"{elapsed:>5.0f}{users:>7}{stats['rps']:>8.1f}{stats['p50']:>9.1f}{stats['p95']:>9.1f}"
+          f"{stats['p99']:>9.1f}{stats['errors']:>8}{stats['locks']:>8}", flush=True)
+
+
+class LoadRun:
+    def __init__(self, server, households, think):
+        self.server = server
+        self.think = think
+        self.recorder = Recorder()
+        self.stop = threading.Event()
+        self.users = []
+        # alternate carers and parents across households so any prefix is a fair mix
+        self.identities = []
+        for round_ in range(max(len(h.carer_emails) for h in households) + 1):
+            for household in households:
+                if round_ < len(household.carer_emails):
+                    self.identities.append((household, "carer", household.carer_emails[round_]))
+                elif round_ == len(household.carer_emails):
+                    self.identities.append((household, "parent", household.parent_email))
+        self.started = time.time()
+        self.per_action = {}
+
+    def add_user(self):
+        household, role, email = self.identities[len(self.users) % len(self.identities)]
+        user = VirtualUser(self.server.base_url, household, role, email, self.think, self.recorder, self.stop)
+        self.users.append(user)
+        user.start()
+
+    def ramp_to(self, target, ramp_seconds, report_every, run_seconds):
+        """Add users linearly over ramp_seconds, then hold for the rest of run_seconds."""
+        to_add = target - len(self.users)
+        begin = time.time()
+        next_report = begin + report_every
+        window = []
+        while time.time() - begin < run_seconds:
+            due = to_add if ramp_seconds <= 0 else int(to_add * min(1.0, (time.time() - begin) / ramp_seconds))
+            while len(self.users) < target - to_add + due:
+                self.add_user()
+            time.sleep(0.1)
+            if time.time() >= next_report:
+                samples = self.recorder.drain()
+                window.extend(samples)
+                for s in samples:
+                    self.per_action.setdefault(s[1], []).append(s[2])
+                print_row(time.time() - self.started, len(self.users),
+                          summarize(samples, report_every, self.server.new_lock_errors()))
+                next_report += report_every
+        return window
+
+    def shutdown(self):
+        self.stop.set()
+        for user in self.users:
+            user.join(timeout=30)
+
+
+def find_saturation(run, args):
+    """Double the users each stage until throughput stops scaling or latency/errors blow up."""
+    users = args.start_users
+    best = None
+    while users <= args.max_users:
+        window = run.ramp_to(users, args.stage_seconds / 4, args.report_every, args.stage_seconds)
+        # judge the stage on its second half, after the ramp settled
+        cutoff = time.time() - args.stage_seconds / 2
+        settled = [s for s in window if s[0] >= cutoff]
+        stats = summarize(settled, args.stage_seconds / 2, 0)
+        print(f"-- stage {users} users: {stats['rps']:.1f} req/s, p95 {stats['p95']:.0f} ms, "
+              f"{stats['error_rate']:.1%} errors", flush=True)
+        if stats["error_rate"] > args.max_error_rate:
+            reason = f"error rate {stats['error_rate']:.1%} > {args.max_error_rate:.1%}"
+        elif stats["p95"] > args.max_p95:
+            reason = f"p95 {stats['p95']:.0f} ms > {args.max_p95:.0f} ms"
+        elif best is not None and stats["rps"] < best[1]["rps"] * (1 + args.min_gain):
+            reason = f"throughput grew less than {args.min_gain:.0%} from {best[0]} users"
+        else:
+            best = (users, stats)
+            users *= 2
+            continue
+        print(f"Saturated at {users} users ({reason}).")
+        break
+    else:
+        print(f"Did not saturate up to {args.max_users} users.")
+    if best is not None:
+        print(f"Highest healthy stage: {best[0]} users, {best[1]['rps']:.1f} req/s, "
+              f"p95 {best[1]['p95']:.0f} ms.")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--households", type=int, default=20)
+    parser.add_argument("--carers", type=int, default=2, help="carers per household")
+    parser.add_argument("--users", type=int, default=40, help="virtual users for a fixed run")
+    parser.add_argument("--ramp", type=float, default=20, help="seconds to reach --users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds for a fixed run")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time in seconds (exponential)")
+    parser.add_argument("--report-every", type=float, default=5)
+    parser.add_argument("--sharded", action="store_true", help="run the server with SHARDING_ENABLED=1")
+    parser.add_argument("--dir", help="where to create the database (default: system temp dir)")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--find-saturation", action="store_true")
+    parser.add_argument("--start-users", type=int, default=5)
+    parser.add_argument("--max-users", type=int, default=640)
+    parser.add_argument("--stage-seconds", type=float, default=30)
+    parser.add_argument("--max-p95", type=float, default=1000, help="ms")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.10,
+                        help="smallest throughput gain from doubling users that still counts as scaling")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-load-", dir=args.dir)
+    server = Server(workdir, args.port or free_port(), args.sharded)
+    server.start()
+    try:
+        print(f"Server on {server.base_url} (log: {server.log_path}); creating {args.households} households")
+        households = [create_household(server.base_url, i, args.carers) for i in range(args.households)]
+        server.new_lock_errors()
+
+        run = LoadRun(server, households, args.think)
+        print(HEADER)
+        try:
+            if args.find_saturation:
+                find_saturation(run, args)
+            else:
+                window = run.ramp_to(args.users, args.ramp, args.report_every, args.duration)
+                stats = summarize(window, args.duration, 0)
+                print(f"Overall: {stats['rps']:.1f} req/s, p50 {stats['p50']:.0f} ms, "
+                      f"p95 {stats['p95']:.0f} ms, p99 {stats['p99']:.0f} ms, {stats['error_rate']:.2%} errors")
+        finally:
+            run.shutdown()
+
+        print(f"{'action':<18}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, latencies in sorted(run.per_action.items()):
+            print(f"{name:<18}{len(latencies):>7}{percentile(latencies, 50) * 1000:>9.1f}"
+                  f"{percentile(latencies, 95) * 1000:>9.1f}")
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# benchmarks/read_models.py
+"""ORM hydration versus column-only read models for the read-heavy pages.
+
+Compares the CPU time and peak traced memory of loading the dashboard log
+list and one timetable week through full ORM objects and through
+backend/read_models.py.
+
+    python -m benchmarks.read_models --logs 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.template_render import seed
+
+
+def orm_dashboard(models, household_id):
+    logs = (
+        models.LogEntry.query
+        .filter_by(household_id=household_id)
+        .order_by(models.LogEntry.timestamp.desc())
+        .all()
+    )
+    return [(lg.child.name, lg.category, lg.carer_name, lg.notes, lg.timestamp) for lg in logs]
+
+
+def read_model_dashboard(read_models, household_id):
+    return list(read_models.household_logs(household_id))
+
+
+def orm_week(models, household_id, child_id, start, end):
+    logs = (
+        models.LogEntry.query
+        .filter_by(household_id=household_id, child_id=child_id)
+        .filter(models.LogEntry.timestamp >= start, models.LogEntry.timestamp < end)
+        .order_by(models.LogEntry.timestamp.asc())
+        .all()
+    )
+    return [
+        {"kind": "log", "category": lg.category, "time": lg.timestamp,
+         "title": lg.category, "notes": lg.notes, "carer": lg.carer_name}
+        for lg in logs
+    ]
+
+
+def read_model_week(read_models, household_id, child_id, start, end):
+    return [
+        read_models.TimetableEntry(kind="log", category=lg.category, time=lg.timestamp,
+                                   title=lg.category, notes=lg.notes, carer=lg.carer_name)
+        for lg in read_models.child_logs_between(household_id, child_id, start, end)
+    ]
+
+
+def measure(db, fn, repeat):
+    best_cpu = None
+    peak = 0
+    rows = 0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        tracemalloc.start()
+        started = time.process_time()
+        result = fn()
+        cpu = time.process_time() - started
+        _, run_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = len(result)
+        del result
+        best_cpu = cpu if best_cpu is None else min(best_cpu, cpu)
+        peak = max(peak, run_peak)
+    return best_cpu, peak, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=50000, help="log entries in the household")
+    parser.add_argument("--children", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+
+    from backend.app import app
+    from backend import models, read_models
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    # last full week, so the seeded history covers every day
+    start = today - timedelta(days=today.weekday() + 7)
+    end = start + timedelta(days=7)
+
+    with app.app_context():
+        models.db.create_all()
+        seed(models.db, models, args.logs // args.children, args.children)
+        household_id = models.Household.query.first().id
+        child_id = models.Child.query.first().id
+
+        cases = [
+            ("dashboard", "orm", lambda: orm_dashboard(models, household_id)),
+            ("dashboard", "columns", lambda: read_model_dashboard(read_models, household_id)),
+            ("week", "orm", lambda: orm_week(models, household_id, child_id, start, end)),
+            ("week", "columns", lambda: read_model_week(read_models, household_id, child_id, start, end)),
+        ]
+
+        print(f"{args.logs} logs across {args.children} children")
+        print(f"{'view':<11}{'path':<9}{'rows':>7}{'cpu ms':>9}{'us/row':>8}{'peak MiB':>10}{'B/row':>7}")
+        for view, path, fn in cases:
+            cpu, peak, rows = measure(models.db, fn, args.repeat)
+            per_row = max(rows, 1)
+            print(f"{view:<11}{path:<9}{rows:>7}{cpu * 1000:>9.1f}"
+                  f"{cpu * 1e6 / per_row:>8.1f}{peak / 2**20:>10.1f}{peak / per_row:>7.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/shard_writes.py
+"""add_log-style write throughput across many households, single DB vs shards.
+
+Each mode runs in a fresh interpreter because the app reads its database
+settings at import time.
+
+    python -m benchmarks.shard_writes --households 32 --threads 16 --writes 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_worker(args):
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-", dir=args.dir)
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+    os.environ["SHARD_DIR"] = os.path.join(workdir, "shards")
+    os.environ["SHARDING_ENABLED"] = "1" if args.mode == "sharded" else "0"
+
+    from sqlalchemy.exc import OperationalError
+
+    from backend.app import app
+    from backend.models import db, Household, Child, LogEntry
+    from backend.sharding import use_household
+
+    children = {}
+    with app.app_context():
+        db.create_all()
+        households = [Household(name=f"Household {i}") for i in range(args.households)]
+        db.session.add_all(households)
+        db.session.commit()
+        for household in households:
+            use_household(household.id)
+            child = Child(household_id=household.id, name="Child", date_of_birth="01/01/2022")
+            db.session.add(child)
+            db.session.commit()
+            children[household.id] = child.id
+
+    household_ids = sorted(children)
+    latencies = []
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def writer(thread_index):
+        mine = household_ids[thread_index::args.threads] or household_ids[:1]
+        local_latencies = []
+        local_errors = {"locked": 0, "other": 0}
+        with app.app_context():
+            for i in range(args.writes):
+                household_id = mine[i % len(mine)]
+                use_household(household_id)
+                started = time.perf_counter()
+                try:
+                    db.session.add(LogEntry(
+                        household_id=household_id,
+                        child_id=children[household_id],
+                        carer_name="Carer",
+                        category="Diet",
+                        notes="Ate all of lunch.",
+                        timestamp=datetime.utcnow(),
+                    ))
+                    db.session.commit()
+                    local_latencies.append(time.perf_counter() - started)
+                except OperationalError as exc:
+                    db.session.rollback()
+                    local_errors["locked" if "locked" in str(exc) else "other"] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            for key, value in local_errors.items():
+                errors[key] += value
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        "mode": args.mode,
+        "writes": len(latencies),
+        "seconds": elapsed,
+        "per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "locked": errors["locked"],
+        "other_errors": errors["other"],
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--households", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200, help="commits per thread")
+    parser.add_argument("--dir", help="where to create the databases (default: system temp dir)")
+    parser.add_argument("--mode", choices=("single", "sharded"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        run_worker(args)
+        return 0
+
+    print(f"{args.households} households, {args.threads} threads x {args.writes} commits")
+    print(f"{'mode':<9}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'locked':>8}{'errors':>8}")
+    for mode in ("single", "sharded"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.shard_writes", "--mode", mode,
+             "--households", str(args.households), "--threads", str(args.threads),
+             "--writes", str(args.writes)] + (["--dir", args.dir] if args.dir else []),
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<9}{result['per_second']:>10.0f}{result['p50_ms']:>9.2f}"
+              f"{result['p99_ms']:>9.2f}{result['locked']:>8}{result['other_errors']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# benchmarks/template_render.py
+"""Time-to-first-byte and peak memory of the dashboard and timetable.
+
+Builds a throwaway database with one large household and requests each page
+with buffered rendering and with streamed rendering.
+
+    python -m benchmarks.template_render --logs 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+CATEGORIES = ["Diet", "Sleep", "Behaviour", "Medical", "Other"]
+
+
+def seed(db, models, logs_per_child, children):
+    household = models.Household(name="Benchmark household")
+    db.session.add(household)
+    db.session.commit()
+    user = models.User(email="bench@example.com", role="parent", household_id=household.id)
+    user.set_password("bench")
+    db.session.add(user)
+    kids = [
+        models.Child(household_id=household.id, name=f"Child {i}", date_of_birth="01/01/2022")
+        for i in range(children)
+    ]
+    db.session.add_all(kids)
+    db.session.commit()
+
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    rows = []
+    for kid in kids:
+        for i in range(logs_per_child):
+            rows.append({
+                "household_id": household.id,
+                "child_id": kid.id,
+                "carer_name": "Carer",
+                "category": rng.choice(CATEGORIES),
+                "notes": "Ate lunch, napped for an hour and played in the garden.",
+                "timestamp": now - timedelta(minutes=37 * i + rng.randrange(30)),
+            })
+    db.session.execute(db.insert(models.LogEntry), rows)
+    db.session.commit()
+
+
+def measure(client, url):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    body = iter(response.response)
+    first = next(body)
+    ttfb = time.perf_counter() - started
+    size = len(first)
+    for chunk in body:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, peak, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=20000, help="log entries per child")
+    parser.add_argument("--children", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nannyloop-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["TEMPLATE_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+
+    from backend.app import app
+    from backend import models
+
+    with app.app_context():
+        models.db.create_all()
+        seed(models.db, models, args.logs, args.children)
+
+    client = app.test_client()
+    client.post("/login", data={"email": "bench@example.com", "password": "bench"})
+
+    print(f"{args.children} children x {args.logs} logs")
+    print(f"{'page':<12}{'mode':<10}{'ttfb ms':>10}{'total ms':>10}{'peak MiB':>10}{'KiB':>8}")
+    for url in ("/dashboard", "/timetable"):
+        for streamed in (False, True):
+            app.config["STREAM_TEMPLATES"] = streamed
+            results = [measure(client, url) for _ in range(args.repeat)]
+            ttfb, total, peak, size = min(results)
+            print(f"{url:<12}{'stream' if streamed else 'buffer':<10}"
+                  f"{ttfb * 1000:>10.1f}{total * 1000:>10.1f}"
+                  f"{peak / 2**20:>10.1f}{size / 1024:>8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())